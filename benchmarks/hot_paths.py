@@ -0,0 +1,305 @@
+"""
+End-to-end benchmark of the booking hot paths (login, `book-spot`, `book-free` and `show-spots`).
+
+The commands run in this process, the way the CLI runs them, against the local fake service
+(`tidarator.fake_server`, started in a separate process), so no real booking is touched and the results don't depend
+on the production service. Every command is measured with 1 and 20 bookable workdays and 10 and 500 spots per zone.
+The service is reset before every run, so the runs are repeatable.
+
+For every scenario the median wall time and CPU time of a run, the number of HTTP requests, the median and
+99th percentile of the requests' latency (as seen by the app) and the peak of the memory allocated during a run
+(measured in an extra run, as tracing the allocations slows the code down) are reported.
+The numbers of requests are compared with the baseline committed in `benchmarks/hot_paths_baseline.json`: they don't
+depend on the machine, so more requests than in the baseline are always a regression. Times and memory do depend on
+the machine, so they are compared only with a baseline given with `--baseline`, saved earlier on the same machine:
+
+    python benchmarks/hot_paths.py --save-baseline /tmp/hot_paths.json
+    python benchmarks/hot_paths.py --baseline /tmp/hot_paths.json
+
+After an intended change of the requests, update the committed baseline (`--save-baseline` with its path).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import date, timedelta
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+BASELINE = ROOT / "benchmarks" / "hot_paths_baseline.json"
+
+DAYS = (1, 20)
+SPOTS = (10, 500)
+COMMANDS = ("login", "book-spot", "book-free", "show-spots")
+
+# the machine-dependent measures compared with a baseline given with --baseline (allowed change is --tolerance)
+GATED = ("wall_s", "cpu_s", "peak_kib")
+
+
+def workdays_span(workdays: int) -> int:
+    """
+    Return the number of days (from today) that contain the given number of workdays.
+    """
+    day, span = date.today(), 0
+    while workdays > 0:
+        workdays -= day.weekday() < 5
+        day += timedelta(days=1)
+        span += 1
+    return span
+
+
+def first_workday() -> str:
+    day = date.today()
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.isoformat()
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Return the q-th percentile (nearest rank) of the values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeService:
+    """
+    The fake service running in a subprocess (so its work doesn't count as the app's CPU time and allocations).
+    """
+
+    def __init__(self, port: int, days: int, spots: int, latency: float):
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "tidarator.fake_server", "--port", str(port), "--zones", "1",
+             "--spots", str(spots), "--days", str(workdays_span(days)), "--latency", str(latency), "--seed", "1"],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        )
+        # the server prints its address once it listens
+        if not re.search(r"http://\S+", self.process.stdout.readline()):
+            self.stop()
+            raise RuntimeError("The fake service didn't start")
+
+    def _post(self, path: str) -> dict:
+        with urllib.request.urlopen(urllib.request.Request(self.url + path, method="POST", data=b"")) as response:
+            return json.load(response)
+
+    def reset(self):
+        self._post("/_reset")
+
+    def request_count(self) -> int:
+        with urllib.request.urlopen(self.url + "/_stats") as response:
+            return sum(json.load(response)["requests"].values())
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+class RequestTimer:
+    """
+    Collects the latency (until the response headers arrive) of every HTTP request the app sends.
+    """
+
+    def __init__(self):
+        self.latencies = []
+
+    def install(self):
+        from requests.adapters import HTTPAdapter
+
+        send = HTTPAdapter.send
+        latencies = self.latencies
+
+        def timed_send(adapter, request, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return send(adapter, request, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        HTTPAdapter.send = timed_send
+
+
+def command_runner(command: str, days: int, secrets_file: pathlib.Path):
+    import tictl
+    from tidarator.config import load_config
+
+    if command == "login":
+        def run():
+            # no stored session, so the whole login flow is run
+            secrets_file.unlink(missing_ok=True)
+            tictl.get_logged_session(load_config())
+
+        return run
+
+    args = {
+        "book-spot": ["book-spot", "-d", first_workday()],
+        "book-free": ["book-free", "-c", "4"],
+        "show-spots": ["show-spots", "-n", str(workdays_span(days))],
+    }[command]
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            tictl.cli.main(args=args, prog_name="tidarator", standalone_mode=False)
+
+    return run
+
+
+def measure(run, service: FakeService, timer: RequestTimer, repeat: int) -> dict:
+    walls, cpus, requests = [], [], []
+    timer.latencies.clear()
+    for _ in range(repeat):
+        service.reset()
+        cpu, start = time.process_time(), time.perf_counter()
+        run()
+        walls.append(time.perf_counter() - start)
+        cpus.append(time.process_time() - cpu)
+        requests.append(service.request_count())
+    latencies = list(timer.latencies)
+
+    service.reset()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_s": round(statistics.median(walls), 4),
+        "cpu_s": round(statistics.median(cpus), 4),
+        "requests": max(requests),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_kib": round(peak / 1024),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float, gated: tuple[str, ...] = GATED) -> tuple[str, bool]:
+    """
+    Return the changes against the baseline (as text) and whether any of them is a regression.
+    The request count is always compared, the other measures only if they are `gated`.
+    """
+    changes, regressed = [], False
+    for key in gated:
+        if baseline.get(key):
+            change = result[key] / baseline[key] - 1
+            changes.append(f"{key.removesuffix('_s').removesuffix('_kib')} {change:+.0%}")
+            regressed |= change > tolerance
+    if "requests" in baseline and result["requests"] != baseline["requests"]:
+        changes.append(f"requests {result['requests'] - baseline['requests']:+d}")
+        regressed |= result["requests"] > baseline["requests"]
+    return ", ".join(changes), regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Runs per scenario (default: 5).")
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="Latency (in seconds) of the fake service's responses (default: 0.005).")
+    parser.add_argument("-k", "--only", action="append", default=[],
+                        help="Run only the scenarios, which names contain this text (may be repeated).")
+    parser.add_argument("--baseline", type=pathlib.Path,
+                        help="Compare times and memory with the results saved in this file (on the same machine). "
+                             "Without it, only the numbers of requests are compared with the committed baseline.")
+    parser.add_argument("--save-baseline", type=pathlib.Path, help="Save the results to this file.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed increase of time and memory against the baseline (fraction, default: 0.2).")
+    args = parser.parse_args()
+
+    baseline_file = args.baseline or BASELINE
+    gated = GATED if args.baseline else ()
+    baseline = json.loads(baseline_file.read_text()) if baseline_file.exists() else {}
+    if gated and baseline and baseline["settings"]["latency"] != args.latency:
+        print(f"Warning: the baseline was measured with --latency {baseline['settings']['latency']}")
+    baseline_results = baseline.get("scenarios", {})
+
+    port = free_port()
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="tidarator-benchmark-"))
+    # the app reads its configuration when imported, so it's set first (a real session must not be touched)
+    os.environ.update({
+        "PARKANIZER_API": f"http://127.0.0.1:{port}/api",
+        "PARKANIZER_LOGIN_URL": f"http://127.0.0.1:{port}/login",
+        "SESSION_SECRETS_DIR": str(workdir),
+        "CACHE_DIR": str(workdir / "cache"),
+        "TIDARO_USER": "benchmark@example.com",
+        "TIDARO_PASSWORD": "benchmark",
+        "SPOT_ZONE": "Zone A",
+        "SPOT_NAMES": "05,10,*",
+        "LOOK_AHEAD": "0",
+    })
+    # no logging config there, so the app logs only warnings (and no log file is left behind)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    secrets_file = workdir / "session_secrets"
+
+    timer = RequestTimer()
+    timer.install()
+    results = {}
+    regressions = []
+    try:
+        for days in DAYS:
+            for spots in SPOTS:
+                names = {command: f"{command}/days={days}/spots={spots}" for command in COMMANDS}
+                names = {c: n for c, n in names.items() if not args.only or any(o in n for o in args.only)}
+                if not names:
+                    continue
+
+                service = FakeService(port, days, spots, args.latency)
+                try:
+                    # a new service doesn't know the stored session, zones and spots
+                    secrets_file.unlink(missing_ok=True)
+                    shutil.rmtree(workdir / "cache", ignore_errors=True)
+                    for command, name in names.items():
+                        run = command_runner(command, days, secrets_file)
+                        service.reset()
+                        run()  # warm up (imports, login, cached zones and spots)
+                        result = results[name] = measure(run, service, timer, args.repeat)
+
+                        line = (f"{name:<30} wall {result['wall_s'] * 1000:8.1f} ms  cpu {result['cpu_s'] * 1000:7.1f} ms"
+                                f"  requests {result['requests']:4d}  p50 {result['p50_ms']:6.2f} ms"
+                                f"  p99 {result['p99_ms']:6.2f} ms  peak {result['peak_kib']:6d} KiB")
+                        if name in baseline_results:
+                            changes, regressed = compare(result, baseline_results[name], args.tolerance, gated)
+                            if changes:
+                                line += f"   ({changes} vs baseline)"
+                            if regressed:
+                                regressions.append(name)
+                        print(line, flush=True)
+                finally:
+                    service.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(
+            {"settings": {"latency": args.latency, "repeat": args.repeat}, "scenarios": results}, indent=2) + "\n")
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
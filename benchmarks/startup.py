@@ -0,0 +1,119 @@
+"""
+Startup-time benchmark for the `tidarator` CLI.
+
+Every scenario is run in a fresh Python process (cold start), a number of times, and the median wall time is reported.
+The times depend on the machine, so to notice startup regressions compare them with a baseline saved earlier on the
+same machine (`benchmarks/startup_baseline.json` holds the results of the machine the project is developed on):
+
+    python benchmarks/startup.py --save-baseline /tmp/startup.json
+    python benchmarks/startup.py --baseline /tmp/startup.json
+
+With `--imports`, the slowest imports of each scenario (from `python -X importtime`) are listed as well.
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+SCENARIOS = {
+    # click dispatch only, no command is run
+    "help": ["tictl.py", "--help"],
+    # the group callback (configuration) runs, the command doesn't
+    "book-spot-help": ["tictl.py", "book-spot", "--help"],
+    # everything `book-spot` loads before it sends the first request
+    "book-spot-cold-start": [
+        "-c",
+        "import tictl; "
+        "from tidarator.api.session_spot import ParkanizerSpotSession; "
+        "from tidarator.spots.book_spot import BookSpot; "
+        "from tidarator.spots.cache_registry import CacheRegistry",
+    ],
+}
+
+# the configuration is required by the commands, but not used by the scenarios
+DUMMY_ENV = {
+    "TIDARO_USER": "benchmark@example.com",
+    "TIDARO_PASSWORD": "benchmark",
+    "SPOT_ZONE": "benchmark",
+    "SPOT_NAMES": "*",
+}
+
+
+def _env():
+    return {**DUMMY_ENV, **os.environ}
+
+
+def run_scenario(args: list[str], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, env=_env(), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(args: list[str], top: int = 10) -> list[tuple[str, int]]:
+    """
+    Return the modules with the highest cumulative import time (in microseconds).
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, env=_env(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.removeprefix("import time:").split("|"))
+        imports.append((name, int(cumulative)))
+    return sorted(imports, key=lambda i: i[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--repeat", type=int, default=10, help="Runs per scenario (default: 10).")
+    parser.add_argument("--baseline", type=pathlib.Path,
+                        help="Compare with the results saved in this file (on the same machine).")
+    parser.add_argument("--save-baseline", type=pathlib.Path, help="Save the results to this file.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline (fraction, default: 0.2).")
+    parser.add_argument("--imports", action="store_true", help="List the slowest imports of each scenario.")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    results = {}
+    regressions = []
+
+    for name, scenario in SCENARIOS.items():
+        run_scenario(scenario, 1)  # warm the file system cache and the bytecode
+        timings = run_scenario(scenario, args.repeat)
+        median = statistics.median(timings)
+        results[name] = {"median_s": round(median, 4), "min_s": round(min(timings), 4)}
+
+        line = f"{name:<24} median {median * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms"
+        if name in baseline:
+            change = median / baseline[name]["median_s"] - 1
+            line += f"   ({change:+.0%} vs baseline)"
+            if change > args.tolerance:
+                regressions.append(name)
+        print(line)
+
+        if args.imports:
+            for module, cumulative in slowest_imports(scenario):
+                print(f"    {module:<40} {cumulative / 1000:8.1f} ms")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+
+    if regressions:
+        print(f"Startup regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
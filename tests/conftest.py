@@ -0,0 +1,62 @@
+"""
+The tests run against the local fake service (`tidarator.fake_server`), started once in the test process.
+The app reads the service's address when it's imported, so the environment is set here, before any test imports it.
+"""
+import os
+import socket
+import tempfile
+
+import pytest
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+os.environ["PARKANIZER_API"] = f"http://127.0.0.1:{PORT}/api"
+os.environ["PARKANIZER_LOGIN_URL"] = f"http://127.0.0.1:{PORT}/login"
+os.environ["SESSION_SECRETS_DIR"] = tempfile.mkdtemp(prefix="tidarator-tests-")
+
+from tidarator.fake_server import FakeParkanizerServer, FakeParkanizerState  # noqa: E402
+
+ZONE = "Zone A"
+ZONE_ID = "zone-0"
+
+
+def spot_id(name: str) -> str:
+    return f"{ZONE_ID}-spot-{name}"
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    # one zone with six spots, all of them free (the tests take the spots away themselves)
+    state = FakeParkanizerState(zones=1, spots=6, occupancy=0, seed=1)
+    server = FakeParkanizerServer(("127.0.0.1", PORT), state)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def service(fake_server):
+    """
+    The fake service with the initial spots and reservations and without injected failures.
+    """
+    fake_server.state.reset()
+    fake_server.error_rate = 0.0
+    fake_server.drop_rate = 0.0
+    yield fake_server
+    fake_server.error_rate = 0.0
+    fake_server.drop_rate = 0.0
+
+
+@pytest.fixture
+def session(service, tmp_path):
+    from tidarator.api.session_spot import ParkanizerSpotSession
+
+    session = ParkanizerSpotSession(secrets_file=tmp_path / "session_secrets")
+    assert session.login("tester@example.com", "secret")
+    return session
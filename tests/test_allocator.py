@@ -0,0 +1,61 @@
+import itertools
+
+import pytest
+
+from tidarator.spots.allocator import allocate, preference_ranks, solve_assignment
+
+
+def brute_force(cost: list[list[float]]) -> float:
+    return min(sum(row[column] for row, column in zip(cost, columns))
+               for columns in itertools.permutations(range(len(cost[0])), len(cost)))
+
+
+@pytest.mark.parametrize("cost", [
+    [[4, 1, 3], [2, 0, 5], [3, 2, 2]],
+    [[1, 2, 3, 4], [2, 4, 6, 8], [3, 6, 9, 12]],
+    [[7, 3], [2, 9]],
+    [[5]],
+])
+def test_assignment_is_minimal(cost):
+    assignment = solve_assignment(cost)
+
+    assert len(set(assignment)) == len(cost)
+    assert sum(row[column] for row, column in zip(cost, assignment)) == brute_force(cost)
+
+
+def test_assignment_needs_enough_columns():
+    with pytest.raises(ValueError):
+        solve_assignment([[1], [2]])
+
+
+def test_preference_ranks():
+    assert preference_ranks(["25", "11", "*"], ["11", "30"]) == {"11": 1, "30": 2}
+    assert preference_ranks(["25", "11"], ["30"]) == {}
+
+
+def test_every_account_gets_a_distinct_spot():
+    allocation = allocate({"alice": ["25", "11"], "bob": ["25", "11"]}, ["11", "25"])
+
+    assert sorted(allocation.values()) == ["11", "25"]
+
+
+def test_as_many_accounts_as_possible_get_a_spot():
+    # alice would rather have 25, but then bob gets nothing
+    allocation = allocate({"alice": ["25", "11"], "bob": ["25"]}, ["11", "25"])
+
+    assert allocation == {"alice": "11", "bob": "25"}
+
+
+def test_second_choices_for_everybody_beat_a_first_and_a_third():
+    allocation = allocate({"alice": ["1", "2", "3"], "bob": ["1", "3", "2"], "carol": ["1", "2", "3"]},
+                          ["1", "2", "3"])
+
+    assert len(set(allocation.values())) == 3
+
+
+def test_accounts_without_an_acceptable_spot_get_none():
+    allocation = allocate({"alice": ["25"], "bob": ["25"], "carol": ["*"]}, ["25", "30"])
+
+    assert allocation["carol"] == "30"
+    assert sorted([allocation["alice"], allocation["bob"]], key=str) == ["25", None]
+    assert allocate({}, ["25"]) == {}
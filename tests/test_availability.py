@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from tidarator.spots.availability import AvailabilityMatrix
+
+
+def states(*free: str, names=("01", "02", "03")) -> list[dict]:
+    return [{'id': f"id-{name}", 'name': name, 'free': name in free} for name in names]
+
+
+def test_days_with_free_preferred_spots():
+    matrix = AvailabilityMatrix("zone", {
+        "2024-05-06": states("01"),
+        "2024-05-07": states("02", "03"),
+        "2024-05-08": states(),
+    })
+
+    assert matrix.days_with_free(["02"]) == ["2024-05-07"]
+    assert matrix.days_with_free(["01", "03"]) == ["2024-05-06", "2024-05-07"]
+    assert matrix.days_with_free(["*"]) == ["2024-05-06", "2024-05-07"]
+    assert matrix.days_with_free() == ["2024-05-06", "2024-05-07"]
+    assert matrix.days_with_free(["99"]) == []
+
+
+def test_spots_state_round_trip():
+    day = states("02")
+    matrix = AvailabilityMatrix("zone", {"2024-05-06": day})
+
+    assert matrix.spots_state("2024-05-06") == day
+    assert matrix.covers("zone", "2024-05-06")
+    assert not matrix.covers("zone", "2024-05-07")
+    assert not matrix.covers("other-zone", "2024-05-06")
+
+
+class FlakySpotManager:
+    """
+    Returns the spots' state, failing for the given days.
+    """
+
+    def __init__(self, failing: set[str]):
+        self.failing = failing
+
+    def get_spots_state(self, zone_id: str, for_date: datetime) -> list[dict]:
+        day = for_date.strftime("%Y-%m-%d")
+        if day in self.failing:
+            raise RuntimeError(f"Service unavailable for {day}")
+        return states("01")
+
+
+def test_fetch_leaves_out_the_days_that_failed():
+    days = ["2024-05-06", "2024-05-07", "2024-05-08"]
+
+    matrix = AvailabilityMatrix.fetch(FlakySpotManager({"2024-05-07"}), "zone", days, concurrency=2)
+
+    assert matrix.covers("zone", "2024-05-06")
+    assert not matrix.covers("zone", "2024-05-07")
+    assert matrix.days_with_free(["01"]) == ["2024-05-06", "2024-05-08"]
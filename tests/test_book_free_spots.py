@@ -0,0 +1,39 @@
+from datetime import date
+
+from conftest import ZONE
+from tidarator.spots.book_free_spots import BookFreeSpots
+from tidarator.spots.cache_registry import CacheRegistry
+
+
+def book_free(session, concurrency: int = 1) -> tuple[dict, list]:
+    payload = {'zone_name': ZONE, 'spot_name': ["02", "*"], 'start_from': date.today().isoformat()}
+    action = BookFreeSpots(session, payload, concurrency=concurrency, caches=CacheRegistry(session))
+    errors = []
+    action.register_listener(lambda event, data: errors.append(data), 'error')
+    return action.do(), errors
+
+
+def test_books_every_workday(service, session):
+    result, errors = book_free(session)
+
+    assert errors == []
+    workdays = [day for day in service.state.days() if date.fromisoformat(day).weekday() < 5]
+    assert [r['request']['for_date'] for r in result['result']] == workdays
+    assert all(r['result']['status'] == 'success' for r in result['result'])
+
+
+def test_reports_bookings_that_cannot_be_fetched(service, session):
+    service.error_rate = 1.0
+
+    result, errors = book_free(session)
+
+    assert result['result']['status'] == 'error'
+    assert errors == [result]
+
+
+def test_survives_failing_requests(service, session):
+    service.error_rate = 0.3
+    for concurrency in (1, 4):
+        # some days fail, but the run goes on and reports them
+        result, _ = book_free(session, concurrency)
+        assert isinstance(result['result'], (list, dict))
@@ -0,0 +1,48 @@
+from datetime import date
+
+from conftest import ZONE, ZONE_ID, spot_id
+from tidarator.spots.book_spot import BookSpot
+from tidarator.spots.cache_registry import CacheRegistry
+
+DAY = date.today().isoformat()
+
+
+def payload(*spots: str) -> dict:
+    return {'for_date': DAY, 'zone_name': ZONE, 'spot_name': list(spots)}
+
+
+def booked_spot(service, user: str = "tester@example.com") -> str | None:
+    reservation = service.state.reservations.get((user, DAY))
+    return reservation[1]["name"] if reservation else None
+
+
+def test_race_books_the_best_free_preference(service, session):
+    for _ in range(5):
+        result = BookSpot(session, payload("02", "03", "04"), CacheRegistry(session), race=3).do()
+        assert result['result']['status'] == 'success'
+        assert booked_spot(service) == "02"
+        session.release_spot(DAY)
+
+
+def test_race_swaps_a_worse_winner_for_a_free_better_spot(service, session):
+    book = BookSpot(session, payload("02", "03"), CacheRegistry(session), race=2)
+    # the request for the worse spot arrived first, so the one for the better spot was rejected
+    won = session.take_spot(ZONE_ID, spot_id("03"), DAY)
+
+    response = book._settle_race(ZONE_ID, [spot_id("02"), spot_id("03")], [(spot_id("03"), won)], book.payload)
+
+    assert response['status'] == 'Reserved'
+    assert response['receivedParkingSpotOrNull']['name'] == "02"
+    assert booked_spot(service) == "02"
+
+
+def test_race_keeps_the_winner_when_better_spots_are_taken(service, session):
+    service.state.taken[(ZONE_ID, DAY)].add(spot_id("02"))
+    book = BookSpot(session, payload("02", "03"), CacheRegistry(session), race=2)
+    won = session.take_spot(ZONE_ID, spot_id("03"), DAY)
+
+    response = book._settle_race(ZONE_ID, [spot_id("02"), spot_id("03")], [(spot_id("03"), won)], book.payload)
+
+    assert response is won
+    assert booked_spot(service) == "03"
+    assert service.state.requests["POST /api/employee-reservations/resign"] == 0
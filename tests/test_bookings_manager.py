@@ -0,0 +1,76 @@
+import sys
+import threading
+
+from tidarator.spots.bookings_manager import BookingsCacheManager
+
+ZONE_ID = "zone-0"
+DAYS = ["2026-10-19", "2026-10-20"]
+
+
+class FakeSession:
+    """
+    Returns the same bookings of a zone every time (none of the days booked), counting the fetches.
+    """
+
+    def __init__(self):
+        self.fetches = 0
+
+    def get_spots(self, zone_id: str):
+        self.fetches += 1
+        return {"weeks": [{"week": [{"day": day, "freeSpots": 3, "reservedParkingSpotOrNull": None} for day in DAYS]}]}
+
+
+def test_bookings_are_fetched_again_only_when_invalidated():
+    session = FakeSession()
+    manager = BookingsCacheManager(session)
+
+    assert manager.get_by_date(ZONE_ID, DAYS[0])['free_spots'] == 3
+    assert len(manager.get_bookings(ZONE_ID)) == 2
+    assert session.fetches == 1
+
+    manager.record_booking(ZONE_ID, DAYS[0], {"id": "zone-0-spot-02", "name": "02"})
+    assert manager.get_by_date(ZONE_ID, DAYS[0])['my_booking']['name'] == "02"
+    assert session.fetches == 1
+
+    manager.invalidate(ZONE_ID, DAYS[1])
+    # only a read of the stale day fetches the bookings again
+    manager.get_by_date(ZONE_ID, DAYS[0])
+    assert session.fetches == 1
+    manager.get_by_date(ZONE_ID, DAYS[1])
+    assert session.fetches == 2
+
+
+def test_reads_survive_concurrent_invalidation():
+    manager = BookingsCacheManager(FakeSession())
+    stop = threading.Event()
+    errors = []
+
+    def invalidate():
+        while not stop.is_set():
+            manager.invalidate()
+
+    def read():
+        try:
+            for _ in range(5000):
+                assert manager.get_by_date(ZONE_ID, DAYS[0])['day'] == DAYS[0]
+                assert manager.get_bookings(ZONE_ID)
+        except Exception as e:
+            errors.append(e)
+
+    # switch the threads often, so the invalidations land between the reads' steps
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        invalidator = threading.Thread(target=invalidate)
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        invalidator.start()
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        stop.set()
+        invalidator.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
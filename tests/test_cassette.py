@@ -0,0 +1,69 @@
+import gzip
+import json
+
+from requests import Response
+
+from tidarator.api.cassette import REDACTED, CassettePlayer, CassetteRecorder, placeholder_token
+from tidarator.api.token_manager import decode_expiry
+from tidarator.config import PARKANIZER_API
+
+BEARER = "bearer-secret"
+REFRESH = "refresh-secret"
+
+
+class FakeHttp:
+    """
+    Answers every request with tokens in the body and in the cookie.
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        response = Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Set-Cookie"] = f"refresh_token={REFRESH}; Path=/; HttpOnly"
+        response.headers["X-Internal"] = "not recorded"
+        response._content = json.dumps({
+            "accessToken": BEARER,
+            "user": {"name": "tester", "echo": BEARER},
+            "zones": [{"id": "zone-0"}],
+        }).encode()
+        return response
+
+
+def record(path) -> Response:
+    recorder = CassetteRecorder(path)
+    response = recorder.request(FakeHttp(), "POST", f"{PARKANIZER_API}/auth/refresh",
+                                secrets=[BEARER, REFRESH, None], json={"refreshToken": REFRESH, "day": "2026-10-19"})
+    recorder.close()
+    return response
+
+
+def test_recorded_cassette_holds_no_tokens(tmp_path):
+    path = tmp_path / "cassette.jsonl.gz"
+    response = record(path)
+
+    # the app gets the real response
+    assert response.json()["accessToken"] == BEARER
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        text = f.read()
+    assert BEARER not in text and REFRESH not in text
+    entry = json.loads(text)
+    assert entry["url"] == "/auth/refresh"
+    assert entry["json"] == {"refreshToken": REDACTED, "day": "2026-10-19"}
+    assert entry["headers"]["Set-Cookie"] == f"refresh_token={REDACTED}; Path=/; HttpOnly"
+    assert "X-Internal" not in entry["headers"]
+
+
+def test_replayed_response_is_the_recorded_one(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    record(path)
+    player = CassettePlayer(path, timing=0)
+
+    body = player.request(None, "POST", f"{PARKANIZER_API}/auth/refresh",
+                          json={"refreshToken": "other", "day": "2026-10-19"}).json()
+
+    assert body == {"accessToken": REDACTED, "user": {"name": "tester", "echo": REDACTED}, "zones": [{"id": "zone-0"}]}
+
+
+def test_placeholder_token_stays_valid():
+    assert decode_expiry(placeholder_token(ttl=3600)) > decode_expiry(placeholder_token(ttl=60))
@@ -0,0 +1,55 @@
+from tidarator.notifiers.dispatcher import NotificationDispatcher
+from tidarator.notifiers.gmail import GmailNotifier
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.notifications = []
+        self.digests = []
+
+    def send_notification(self, event_type, data):
+        self.notifications.append((event_type, data))
+
+    def send_digest(self, events):
+        self.digests.append(list(events))
+
+
+def test_dispatcher_coalesces_events_into_a_digest():
+    notifier = RecordingNotifier()
+    dispatcher = NotificationDispatcher(notifier, batch_window=0.5)
+
+    dispatcher.send_notification('success', {'day': 1})
+    dispatcher.send_notification('error', {'error': 'boom'})
+    dispatcher.close()
+
+    assert notifier.digests == [[('success', {'day': 1}), ('error', {'error': 'boom'})]]
+    assert notifier.notifications == []
+
+
+def test_dispatcher_sends_a_single_event_as_is():
+    notifier = RecordingNotifier()
+    dispatcher = NotificationDispatcher(notifier, batch_window=0.01)
+
+    dispatcher.send_notification('error', {'error': 'boom'})
+    dispatcher.close()
+
+    assert notifier.notifications == [('error', {'error': 'boom'})]
+    assert notifier.digests == []
+
+
+class FakeSMTP:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, to, subject, contents):
+        self.sent.append(to)
+
+
+def test_gmail_sends_every_recipient_a_separate_message():
+    notifier = GmailNotifier("bot@example.com", "secret", ["alice@example.com", "bob@example.com"])
+    smtp = notifier._yag = FakeSMTP()
+
+    notifier.send_notification('error', {'error': 'boom'})
+    notifier.send_digest([('error', {'error': 'boom'}), ('error', {'error': 'bang'})])
+
+    assert smtp.sent == ["alice@example.com", "bob@example.com"] * 2
@@ -0,0 +1,71 @@
+from datetime import date
+
+from conftest import ZONE
+from tidarator.api.session_spot import ParkanizerSpotSession
+from tidarator.api.utils import str_to_date
+from tidarator.config import load_accounts
+from tidarator.orchestrator import AccountOrchestrator
+from tidarator.spots.book_free_spots import BookFreeSpots
+from tidarator.spots.cache_registry import CacheRegistry
+
+ACCOUNTS = f"""
+[defaults]
+zone = "{ZONE}"
+spots = ["02", "03"]
+password = "secret"
+
+[[accounts]]
+name = "alice"
+user = "alice@example.com"
+
+[[accounts]]
+name = "bob"
+user = "bob@example.com"
+"""
+
+
+def orchestrator_for(tmp_path) -> tuple[AccountOrchestrator, list[dict]]:
+    accounts_file = tmp_path / "accounts.toml"
+    accounts_file.write_text(ACCOUNTS)
+    configs = load_accounts(accounts_file)
+
+    def login(config):
+        session = ParkanizerSpotSession(secrets_file=tmp_path / f"secrets-{config['account']['name']}")
+        return session if session.login(config["tidaro"]["user"], config["tidaro"]["password"]) else None
+
+    def caches(session, config, metadata):
+        return CacheRegistry(session, metadata=metadata)
+
+    return AccountOrchestrator(configs, login, caches, concurrency=2), configs
+
+
+def test_book_free_with_allocation_requests_one_spot_per_account_and_day(service, tmp_path):
+    orchestrator, configs = orchestrator_for(tmp_path)
+    names = [config["account"]["name"] for config in configs]
+
+    def book_free(config, session, caches):
+        name = config["account"]["name"]
+        payload = {"zone_name": ZONE, "spot_name": config["book-spot"]["spots"], "start_from": date.today().isoformat()}
+        action = BookFreeSpots(session, payload, caches=caches,
+                               spots_for_day=lambda day: orchestrator.allocated_spots(name, str_to_date(day), names))
+        return action.do()
+
+    result = orchestrator.run(book_free, "book-free")
+
+    assert [account['status'] for account in result['result']] == ['success', 'success']
+    workdays = [day for day in service.state.days() if date.fromisoformat(day).weekday() < 5]
+    for day in workdays:
+        booked = {service.state.reservations[(f"{name}@example.com", day)][1]["name"] for name in names}
+        assert booked == {"02", "03"}
+    # no account requested a spot the other one got
+    assert service.state.requests["POST /api/employee-reservations/take-spot-from-marketplace"] == 2 * len(workdays)
+
+
+def test_allocation_leaves_out_accounts_with_a_reservation(service, tmp_path):
+    orchestrator, configs = orchestrator_for(tmp_path)
+    orchestrator.prepare()
+    day = date.today().isoformat()
+    service.state.reservations[("alice@example.com", day)] = ("zone-0", {"id": "zone-0-spot-05", "name": "05"})
+
+    assert orchestrator.allocated_spots("bob", str_to_date(day), ["alice", "bob"]) == ["02"]
+    assert orchestrator.allocated_spots("alice", str_to_date(day), ["alice", "bob"]) == []
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from requests import Timeout
+
+from tidarator.api.retry import FAIL, RETRY, SUCCESS, RetryBudget, RetryPolicy, classify_take_spot
+from tidarator.api.session_base import ParkanizerServerError
+
+RESERVED = {'status': 'Reserved'}
+REJECTED = {'status': 'SpotNotAvailable'}
+
+
+class Calls:
+    """
+    Returns (or raises) the given outcomes one by one.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.count += 1
+            outcome = self.outcomes.pop(0)
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_classify_take_spot():
+    assert classify_take_spot(RESERVED) == SUCCESS
+    assert classify_take_spot(REJECTED) == FAIL
+    assert classify_take_spot(error=ParkanizerServerError("url", 503)) == RETRY
+    assert classify_take_spot(error=Timeout()) == RETRY
+    assert classify_take_spot(error=ValueError()) == FAIL
+
+
+def test_transient_errors_are_retried():
+    calls = Calls(ParkanizerServerError("url", 503), Timeout(), RESERVED)
+
+    outcome = RetryPolicy(max_attempts=3, base_delay=0).call(calls)
+
+    assert outcome.response == RESERVED
+    assert outcome.attempts == 3
+    assert outcome.ambiguous
+
+
+def test_final_responses_are_not_retried():
+    calls = Calls(REJECTED, RESERVED)
+
+    outcome = RetryPolicy(max_attempts=3, base_delay=0).call(calls)
+
+    assert outcome.response == REJECTED
+    assert outcome.attempts == 1
+    assert not outcome.ambiguous
+
+
+def test_budget_limits_the_retries():
+    budget = RetryBudget(1)
+    policy = RetryPolicy(max_attempts=3, base_delay=0, budget=budget)
+
+    outcome = policy.call(Calls(Timeout(), Timeout(), RESERVED))
+
+    assert outcome.response is None
+    assert isinstance(outcome.error, Timeout)
+    assert outcome.attempts == 2
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.5)
+
+    assert all(0 <= policy.backoff(retry) <= 0.5 for retry in range(1, 10))
+
+
+def slow(outcome, delay: float = 0.2):
+    def call():
+        time.sleep(delay)
+        return outcome
+
+    return call
+
+
+def test_hedged_request_wins_when_the_first_is_slow():
+    calls = Calls(slow(RESERVED, 1.0), RESERVED)
+
+    outcome = RetryPolicy(max_attempts=1, hedge_after=0.05).call(calls)
+
+    assert outcome.response == RESERVED
+    assert outcome.attempts == 2
+
+
+def test_hedged_request_after_a_lost_answer_is_ambiguous():
+    # the first request times out (the server may have reserved the spot), the hedge is rejected then
+    calls = Calls(slow(Timeout()), slow(REJECTED, 0.3))
+
+    outcome = RetryPolicy(max_attempts=1, hedge_after=0.05).call(calls)
+
+    assert outcome.response == REJECTED
+    assert outcome.attempts == 2
+    assert outcome.ambiguous
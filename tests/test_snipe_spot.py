@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+from conftest import ZONE, ZONE_ID, spot_id
+from tidarator.spots.cache_registry import CacheRegistry
+from tidarator.spots.snipe_spot import SnipeSpot
+
+DAY = date.today().isoformat()
+
+
+def snipe(session, *spots: str, day: str = DAY, retries: int = 3) -> dict:
+    payload = {'for_date': day, 'zone_name': ZONE, 'spot_name': list(spots), 'fire_at': datetime.now(),
+               'retries': retries, 'retry_interval': 0.01}
+    return SnipeSpot(session, payload, CacheRegistry(session)).do()['result']
+
+
+def test_taken_spots_are_not_requested_again(service, session):
+    service.state.taken[(ZONE_ID, DAY)] |= {spot_id("02"), spot_id("03")}
+
+    result = snipe(session, "02", "03")
+
+    assert result['status'] == 'failure'
+    assert len(result['attempts']) == 2
+
+
+def test_retries_until_the_day_opens(service, session, monkeypatch):
+    # the day count is restored after the test
+    monkeypatch.setattr(service.state, "day_count", service.state.day_count)
+    day = (date.today() + timedelta(days=service.state.day_count)).isoformat()
+    take_spot = session.take_spot_with_payload
+
+    def open_the_day(payload):
+        response = take_spot(payload)
+        service.state.day_count += 1
+        return response
+
+    session.take_spot_with_payload = open_the_day
+    result = snipe(session, "02", day=day)
+
+    assert result['status'] == 'success'
+    assert result['spot'] == "02"
+    assert len(result['attempts']) == 2
+
+
+def test_gives_up_when_the_day_is_booked_already(service, session):
+    session.take_spot(ZONE_ID, spot_id("04"), DAY)
+
+    result = snipe(session, "02")
+
+    assert result['status'] == 'failure'
+    assert len(result['attempts']) == 1
@@ -0,0 +1,89 @@
+from datetime import date, datetime
+
+from conftest import ZONE, ZONE_ID, spot_id
+from tidarator.spots.cache_registry import CacheRegistry
+from tidarator.spots.spot_manager import SpotStateTracker
+from tidarator.watcher import Watcher
+
+DAY = date.today().isoformat()
+FOR_DATE = datetime.combine(date.today(), datetime.min.time())
+
+
+def names(spots: list[dict]) -> list[str]:
+    return [spot['name'] for spot in spots]
+
+
+def test_unchanged_map_is_reused(service, session):
+    spot_manager = CacheRegistry(session).spot_manager
+
+    first = spot_manager.get_spots_state(ZONE_ID, FOR_DATE)
+    second = spot_manager.get_spots_state(ZONE_ID, FOR_DATE)
+
+    assert second is first
+    assert all(spot['free'] for spot in first)
+
+
+def test_accounts_share_spots_but_fetch_the_state_with_their_own_session(service, session, tmp_path, monkeypatch):
+    from tidarator.api.session_spot import ParkanizerSpotSession
+
+    other = ParkanizerSpotSession(secrets_file=tmp_path / "other_secrets")
+    assert other.login("other@example.com", "secret")
+    calls = []
+    for name, s in (("tester", session), ("other", other)):
+        for method in ("get_spots_map", "get_spots_map_if_changed"):
+            fetch = getattr(s, method)
+            monkeypatch.setattr(s, method, lambda *args, fetch=fetch, key=(name, method): calls.append(key) or fetch(*args))
+    owner = CacheRegistry(session)
+    shared = CacheRegistry(other, metadata=owner)
+
+    assert shared.spot_manager.get_by_name(ZONE_ID, "02")['id'] == spot_id("02")
+    assert owner.spot_manager.get_by_name(ZONE_ID, "03")['id'] == spot_id("03")
+    shared.spot_manager.get_spots_state(ZONE_ID, FOR_DATE)
+
+    # the spots are fetched once (for both), the state with the session of the account asking for it
+    assert calls == [("other", "get_spots_map"), ("other", "get_spots_map_if_changed")]
+
+
+def test_tracker_returns_the_changed_spots(service, session):
+    tracker = SpotStateTracker(CacheRegistry(session).spot_manager)
+    taken = service.state.taken[(ZONE_ID, DAY)]
+
+    states, changes = tracker.get_changes(ZONE_ID, FOR_DATE)
+    assert changes == states
+    assert tracker.get_changes(ZONE_ID, FOR_DATE)[1] == []
+
+    taken.add(spot_id("02"))
+    _, changes = tracker.get_changes(ZONE_ID, FOR_DATE)
+    assert [(spot['name'], spot['free']) for spot in changes] == [("02", False)]
+
+    taken.discard(spot_id("02"))
+    taken.add(spot_id("05"))
+    _, changes = tracker.get_changes(ZONE_ID, FOR_DATE)
+    assert [(spot['name'], spot['free']) for spot in changes] == [("02", True), ("05", False)]
+
+
+def test_trackers_do_not_share_what_they_have_seen(service, session):
+    spot_manager = CacheRegistry(session).spot_manager
+    first, second = SpotStateTracker(spot_manager), SpotStateTracker(spot_manager)
+
+    first.get_changes(ZONE_ID, FOR_DATE)
+    service.state.taken[(ZONE_ID, DAY)].add(spot_id("02"))
+    first.get_changes(ZONE_ID, FOR_DATE)
+
+    # the first tracker's look at the map doesn't hide the spots from the second one
+    assert len(second.get_changes(ZONE_ID, FOR_DATE)[1]) == 6
+
+
+def test_watcher_books_only_when_a_preferred_spot_becomes_free(service, session):
+    taken = service.state.taken[(ZONE_ID, DAY)]
+    taken |= {spot_id("02"), spot_id("03")}
+    watcher = Watcher(session, CacheRegistry(session), ZONE, book_day=None, spot_names=["02"])
+
+    _, freed = watcher.freed(ZONE_ID, DAY)
+    assert freed == []
+
+    taken.discard(spot_id("03"))
+    assert watcher.freed(ZONE_ID, DAY)[1] == []
+
+    taken.discard(spot_id("02"))
+    assert names(watcher.freed(ZONE_ID, DAY)[1]) == ["02"]
@@ -0,0 +1,58 @@
+import base64
+import json
+import time
+
+from tidarator.api.token_manager import TokenManager, decode_expiry
+
+
+def token(exp: float) -> str:
+    claims = base64.urlsafe_b64encode(json.dumps({"sub": "tester", "exp": int(exp)}).encode()).decode().rstrip("=")
+    return f"e30.{claims}.signature"
+
+
+class FakeSession:
+    def __init__(self, bearer_token: str):
+        self.bearer_token = bearer_token
+        self.refreshes = 0
+
+    def _try_refresh_token(self):
+        self.refreshes += 1
+        self.bearer_token = token(time.time() + 3600)
+
+    def store_secrets(self):
+        pass
+
+
+def test_decode_expiry():
+    assert decode_expiry(token(1_800_000_000)) == 1_800_000_000
+    assert decode_expiry("not-a-jwt") is None
+    assert decode_expiry("e30.bm90IGpzb24.signature") is None
+    assert decode_expiry("e30.e30.signature") is None
+
+
+def test_token_is_refreshed_only_when_about_to_expire():
+    session = FakeSession(token(time.time() + 3600))
+    manager = TokenManager(session, refresh_margin=120)
+    try:
+        manager.ensure_fresh()
+        assert session.refreshes == 0
+
+        session.bearer_token = token(time.time() + 60)
+        manager.ensure_fresh()
+        assert session.refreshes == 1
+        assert manager.is_fresh()
+    finally:
+        manager.stop()
+
+
+def test_token_replaced_by_a_concurrent_refresh_is_not_refreshed_again():
+    session = FakeSession(token(time.time() + 3600))
+    manager = TokenManager(session)
+    try:
+        assert manager.refresh(stale_token="rejected-token")
+        assert session.refreshes == 0
+
+        assert manager.refresh(stale_token=session.bearer_token)
+        assert session.refreshes == 1
+    finally:
+        manager.stop()
@@ -1,6 +1,7 @@
-from calendar import c
+import hashlib
 import logging
 import os
+import pathlib
 import sys
 from datetime import datetime, timedelta
 
@@ -8,27 +9,169 @@ import click
 from click.core import ParameterSource
 from dotenv import load_dotenv
 
+# the settings in tidarator.config are read from the environment when it's imported, so .env must be loaded first
+load_dotenv()
+
 from tidarator.api import utils
-from tidarator.api.session_spot import ParkanizerSpotSession
-from tidarator.config import load_config, MissingEnvironmentVariableError
+from tidarator.config import (
+    ACCOUNTS_CONCURRENCY,
+    ACCOUNTS_FILE,
+    AVAILABILITY_CONCURRENCY,
+    InvalidAccountsFileError,
+    load_accounts,
+    load_config,
+    MissingEnvironmentVariableError,
+)
 from tidarator.log_config import get_logger
-from tidarator.notifiers.gmail import GmailNotifier
-from tidarator.spots.book_free_spots import BookFreeSpots
-from tidarator.spots.release_spot import ReleaseSpot
-from tidarator.spots.show_bookings import ShowBookings
 
-load_dotenv()
+# Note: the heavier modules (requests, yagmail, the actions) are imported by the commands that need them,
+# so starting the app (and `--help`) stays fast.
+
 logger = get_logger(__name__)
 
 
-def get_logged_session(config):
-    parkanizer_spot = ParkanizerSpotSession()
+def get_secrets_file(config):
+    """
+    Return the file for the account's session secrets (used when many accounts are served by one process).
+    """
+    from tidarator.config import SESSION_SECRETS_DIR
+
+    # don't expose the user name in the file system
+    account_key = hashlib.sha256(config["tidaro"]["user"].encode("utf-8")).hexdigest()[:16]
+    return SESSION_SECRETS_DIR / f"session_secrets-{account_key}"
+
+
+def get_logged_session(config, concurrency=1, secrets_file=None):
+    """
+    Create and log in the session. Its connection pool is sized for `concurrency` parallel requests.
+    """
+    from tidarator import config as settings
+    from tidarator.api.session_spot import ParkanizerSpotSession
+    from tidarator.api.transport import TransportConfig
+
+    transport = TransportConfig(
+        pool_size=max(settings.HTTP_POOL_SIZE, concurrency),
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        http2=settings.HTTP2,
+    )
+    parkanizer_spot = ParkanizerSpotSession(transport, secrets_file, cassette=get_cassette())
     result = parkanizer_spot.login(
         config["tidaro"]["user"], config["tidaro"]["password"]
     )
     return parkanizer_spot if result else None
 
 
+_cassette = None
+
+
+def get_cassette():
+    """
+    Return the cassette the API calls are recorded to or replayed from (None unless CASSETTE_MODE is set).
+    """
+    from tidarator.config import CASSETTE_FILE, CASSETTE_MODE, CASSETTE_TIMING
+
+    global _cassette
+    if _cassette is None and CASSETTE_MODE:
+        from tidarator.api.cassette import open_cassette
+
+        try:
+            _cassette = open_cassette(CASSETTE_MODE, CASSETTE_FILE, CASSETTE_TIMING)
+        except (ValueError, OSError) as e:
+            raise click.ClickException(f"Can't use cassette {CASSETTE_FILE}: {e}")
+    return _cassette
+
+
+def close_cassette():
+    if _cassette is not None:
+        _cassette.close()
+
+
+def get_persistent_cache(config):
+    """
+    Return the on-disk cache of zones and spot IDs for the configured account (None if caching is disabled).
+    """
+    from tidarator.config import CACHE_DIR, CACHE_TTL, CASSETTE_MODE
+    from tidarator.spots.persistent_cache import PersistentCache
+
+    # with a cassette, every run asks the service for everything it needs (so a replay doesn't depend on the cache)
+    if CACHE_TTL <= 0 or CASSETTE_MODE:
+        return None
+    return PersistentCache(CACHE_DIR, config["tidaro"]["user"], CACHE_TTL)
+
+
+def get_caches(session, config, metadata=None):
+    """
+    Return caches shared by all the actions run with the session.
+    :param metadata: Registry to share zones and spot IDs with (see `CacheRegistry`).
+    """
+    from tidarator.config import BOOKINGS_CACHE_TTL
+    from tidarator.spots.cache_registry import CacheRegistry
+
+    return CacheRegistry(
+        session, persistent_cache=get_persistent_cache(config), bookings_ttl=BOOKINGS_CACHE_TTL, metadata=metadata
+    )
+
+
+def get_retry_policy():
+    """
+    Return the policy for `take_spot` requests (the retry budget is shared by all bookings made by the command).
+    """
+    from tidarator.api.retry import RetryBudget, RetryPolicy
+    from tidarator.config import TAKE_SPOT_HEDGE_AFTER, TAKE_SPOT_MAX_ATTEMPTS, TAKE_SPOT_RETRY_BUDGET
+
+    return RetryPolicy(
+        max_attempts=TAKE_SPOT_MAX_ATTEMPTS,
+        hedge_after=TAKE_SPOT_HEDGE_AFTER,
+        budget=RetryBudget(TAKE_SPOT_RETRY_BUDGET),
+    )
+
+
+def export_metrics():
+    """
+    Write the timing of the HTTP calls to METRICS_FILE (if it's set).
+    """
+    from tidarator.config import METRICS_FILE
+
+    if METRICS_FILE is None:
+        return
+    from tidarator.metrics import registry
+
+    try:
+        registry.write(METRICS_FILE)
+    except OSError as e:
+        logger.error(f"Couldn't write metrics to {METRICS_FILE}: {e}")
+
+
+def start_tracing():
+    """
+    Record the tracing spans, if TRACE_FILE is set.
+    """
+    from tidarator.config import TRACE_FILE
+
+    if TRACE_FILE is None:
+        return
+    from tidarator import tracing
+
+    tracing.set_tracer(tracing.RecordingTracer())
+
+
+def export_trace():
+    """
+    Write the tracing spans recorded so far to TRACE_FILE (if it's set).
+    """
+    from tidarator.config import TRACE_FILE
+
+    if TRACE_FILE is None:
+        return
+    from tidarator import tracing
+
+    try:
+        tracing.get_tracer().write(TRACE_FILE)
+    except OSError as e:
+        logger.error(f"Couldn't write trace to {TRACE_FILE}: {e}")
+
+
 def log_message(event_type, data):
     logging.info(f"{event_type}, {data}")
 
@@ -40,16 +183,38 @@ def print_result(data):
     click.echo(text)
 
 
+# notification listeners of every account (None is the account configured by the environment)
+_notifiers = {}
+
+
+def get_notifiers(config):
+    """
+    Return notification listeners of the config's account (created once per account and process),
+    so every account's notifications go to its own recipients, in its own digests.
+    The notifications are delivered in the background, so they don't delay the actions.
+    """
+    account = config.get("account", {}).get("name")
+    if account not in _notifiers:
+        listeners = []
+        gmail_config = config.get("notifiers", {}).get("gmail")
+        if gmail_config:
+            from tidarator.notifiers.dispatcher import NotificationDispatcher
+            from tidarator.notifiers.gmail import GmailNotifier
+
+            recipients = gmail_config["recipient"].split(",")
+            if len(recipients) == 1:
+                recipients = recipients[
+                    0
+                ]  # keep it consistent with previous implementation
+            gn = GmailNotifier(gmail_config["user"], gmail_config["password"], recipients)
+            listeners.append(NotificationDispatcher(gn).send_notification)
+        _notifiers[account] = listeners
+    return _notifiers[account]
+
+
 def configure_notifiers_for_action(action, config):
-    gmail_config = config.get("notifiers", {}).get("gmail")
-    if gmail_config:
-        recipients = gmail_config["recipient"].split(",")
-        if len(recipients) == 1:
-            recipients = recipients[
-                0
-            ]  # keep it consistent with previous implementation
-        gn = GmailNotifier(gmail_config["user"], gmail_config["password"], recipients)
-        action.register_listener(gn.send_notification)
+    for listener in get_notifiers(config):
+        action.register_listener(listener)
 
 
 @click.group()
@@ -57,6 +222,13 @@ def configure_notifiers_for_action(action, config):
 def cli(ctx):
     """Tidarator: A command-line tool for managing parking spot bookings on tidaro.com."""
     ctx.ensure_object(dict)
+    start_tracing()
+    ctx.call_on_close(export_metrics)
+    ctx.call_on_close(export_trace)
+    ctx.call_on_close(close_cassette)
+    if ctx.invoked_subcommand == "accounts":
+        # the accounts are configured by the accounts file
+        return
     try:
         ctx.obj["config"] = load_config()
     except MissingEnvironmentVariableError as e:
@@ -81,13 +253,21 @@ def cli(ctx):
     show_default=True,
     help='Name of the spot (may be many values) to book (or "*" for "book any").',
 )
+@click.option(
+    "-r",
+    "--race",
+    default=int(os.environ.get("BOOK_SPOT_RACE", 1)),
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of top preferred spots to request at once."
+)
 @click.pass_context
-def book_spot(ctx, date, spot):
+def book_spot(ctx, date, spot, race):
     """Book a parking spot."""
     logging.info("run_book_spot")
     config = ctx.obj["config"]
     spots = config["book-spot"]["spots"] if not spot else list(spot)
-    session = get_logged_session(config)
+    session = get_logged_session(config, concurrency=race)
 
     payload = {
         "for_date": utils.date_to_str(date),
@@ -96,13 +276,93 @@ def book_spot(ctx, date, spot):
     }
     from tidarator.spots.book_spot import BookSpot
 
-    action = BookSpot(session, payload)
+    action = BookSpot(
+        session, payload, caches=get_caches(session, config), retry_policy=get_retry_policy(), race=race
+    )
     action.register_listener(log_message)
     result = action.do()
 
     print_result(result)
 
 
+def compute_fire_at(fire_at):
+    """
+    Compute the moment to fire the booking requests.
+    Time without a date (HH:MM:SS) means the next occurrence of that time.
+    """
+    if fire_at.year != 1900:
+        return fire_at
+    now = datetime.now()
+    fire_at = datetime.combine(now.date(), fire_at.time())
+    return fire_at if fire_at > now else fire_at + timedelta(days=1)
+
+
+@cli.command(help="Book a parking spot at the exact moment the booking window opens.")
+@click.option(
+    "-d",
+    "--date",
+    default=utils.date_to_str(datetime.today()),
+    show_default=True,
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Date of the reservation in YYYY-MM-DD format.",
+)
+@click.option(
+    "-s",
+    "--spot",
+    multiple=True,
+    show_default=True,
+    help='Name of the spot (may be many values) to book (or "*" for "book any").',
+)
+@click.option(
+    "-a",
+    "--at",
+    "fire_at",
+    required=True,
+    type=click.DateTime(formats=["%H:%M:%S.%f", "%H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"]),
+    help="When to send the booking requests (HH:MM:SS[.ffffff] or YYYY-MM-DD HH:MM:SS[.ffffff]).",
+)
+@click.option(
+    "-r",
+    "--retries",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="How many times to repeat the booking attempts if none of the spots was booked.",
+)
+@click.option(
+    "-i",
+    "--retry-interval",
+    default=0.2,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Delay (in seconds) between the consecutive retries.",
+)
+@click.pass_context
+def snipe_spot(ctx, date, spot, fire_at, retries, retry_interval):
+    """Book a parking spot at the given moment."""
+    logging.info("run_snipe_spot")
+    config = ctx.obj["config"]
+    spots = config["book-spot"]["spots"] if not spot else list(spot)
+    session = get_logged_session(config)
+
+    payload = {
+        "for_date": utils.date_to_str(date),
+        "zone_name": config["book-spot"]["zone"],
+        "spot_name": spots,
+        "fire_at": compute_fire_at(fire_at),
+        "retries": retries,
+        "retry_interval": retry_interval,
+    }
+    from tidarator.spots.snipe_spot import SnipeSpot
+
+    action = SnipeSpot(session, payload, caches=get_caches(session, config))
+    action.register_listener(log_message)
+    configure_notifiers_for_action(action, config)
+    result = action.do()
+
+    print_result(result)
+
+
 @cli.command(help="Release a previously reserved parking spot.")
 @click.option(
     "-d",
@@ -121,7 +381,9 @@ def release_spot(ctx, date):
 
     payload = {"for_date": utils.date_to_str(date)}
 
-    action = ReleaseSpot(session, payload)
+    from tidarator.spots.release_spot import ReleaseSpot
+
+    action = ReleaseSpot(session, payload, caches=get_caches(session, config))
     action.register_listener(log_message)
     result = action.do()
 
@@ -138,7 +400,9 @@ def show_bookings(ctx):
 
     payload = {"zone_name": config["book-spot"]["zone"]}
 
-    action = ShowBookings(session, payload)
+    from tidarator.spots.show_bookings import ShowBookings
+
+    action = ShowBookings(session, payload, caches=get_caches(session, config))
     action.register_listener(log_message)
     configure_notifiers_for_action(action, config)
     result = action.do()
@@ -184,8 +448,24 @@ def compute_start_from(ctx):
     type=click.INT,
     help="Number of days from today to start booking free spots."
 )
+@click.option(
+    "-c",
+    "--concurrency",
+    default=int(os.environ.get("BOOK_FREE_CONCURRENCY", 1)),
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of days to book in parallel."
+)
+@click.option(
+    "-r",
+    "--race",
+    default=int(os.environ.get("BOOK_SPOT_RACE", 1)),
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of top preferred spots to request at once for each day."
+)
 @click.pass_context
-def book_free(ctx, start_from, look_ahead):
+def book_free(ctx, start_from, look_ahead, concurrency, race):
     """
     Book free spots. Start booking from specified date.
     Use either the start-from date or the look-ahead parameter.
@@ -193,7 +473,7 @@ def book_free(ctx, start_from, look_ahead):
     logging.info("run_book_free")
 
     config = ctx.obj["config"]
-    session = get_logged_session(config)
+    session = get_logged_session(config, concurrency=max(concurrency * race, AVAILABILITY_CONCURRENCY))
 
     start_from = utils.date_to_str(compute_start_from(ctx))
     payload = {
@@ -201,41 +481,355 @@ def book_free(ctx, start_from, look_ahead):
         "spot_name": config["book-spot"]["spots"],
         "start_from": start_from,
     }
-    action = BookFreeSpots(session, payload)
+    from tidarator.spots.book_free_spots import BookFreeSpots
+
+    action = BookFreeSpots(
+        session, payload, concurrency=concurrency, caches=get_caches(session, config),
+        retry_policy=get_retry_policy(), race=race, fetch_concurrency=AVAILABILITY_CONCURRENCY,
+    )
     configure_notifiers_for_action(action, config)
     result = action.do()
 
     print_result(result)
 
 
-@cli.command(help="Show spots status for a specific date.")
+@cli.command(help="Show spots status for a specific date (or days).")
 @click.option(
     "-d",
     "--date",
     default=utils.date_to_str(datetime.today()),
     show_default=True,
     type=click.DateTime(formats=["%Y-%m-%d"]),
-    help="Date of interest in YYYY-MM-DD format.",
+    help="Date of interest in YYYY-MM-DD format (the first one, if --days or --to is given).",
+)
+@click.option(
+    "-n",
+    "--days",
+    type=click.IntRange(min=1),
+    help="Number of days to show, starting from --date.",
+)
+@click.option(
+    "-t",
+    "--to",
+    "to_date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Last date to show (inclusive).",
+)
+@click.option(
+    "-z",
+    "--zone",
+    multiple=True,
+    help="Name of the zone (may be many values). Default: the configured zone.",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    default=AVAILABILITY_CONCURRENCY,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of days fetched in parallel.",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    help="Print the results as JSON lines.",
 )
 @click.pass_context
-def show_spots(ctx, date):
+def show_spots(ctx, date, days, to_date, zone, concurrency, as_json):
     """Get spots status for a specific date."""
     logging.info("run_show_spots")
+    if days and to_date:
+        raise click.UsageError("You must specify either --days or --to, not both.")
+    if to_date and to_date < date:
+        raise click.UsageError("--to must not be earlier than --date.")
     config = ctx.obj["config"]
-    session = get_logged_session(config)
+    count = days or ((to_date - date).days + 1 if to_date else 1)
+    dates = [utils.date_to_str(date + timedelta(days=offset)) for offset in range(count)]
+    zones = list(zone) or [config["book-spot"]["zone"]]
 
-    payload = {
-        "for_date": utils.date_to_str(date),
-        "zone_name": config["book-spot"]["zone"],
-    }
+    session = get_logged_session(config, concurrency=concurrency)
 
     from tidarator.spots.show_state import ShowSpotsState
 
-    action = ShowSpotsState(session, payload)
+    action = ShowSpotsState(session, {"for_date": dates[0], "zone_name": zones[0]}, caches=get_caches(session, config))
     action.register_listener(log_message)
-    result = action.do()
+    # the results are printed as they arrive, so the slowest day doesn't hold the others
+    for result in action.stream(zones, dates, concurrency=concurrency):
+        if as_json:
+            import json
 
-    print_result(result)
+            click.echo(json.dumps(result))
+        else:
+            print_result(result)
+
+
+@cli.command(help="Stay resident and run booking commands on a schedule.")
+@click.option(
+    "-s",
+    "--schedule",
+    default=os.environ.get("DAEMON_SCHEDULE", ""),
+    show_default=True,
+    help="Comma-separated jobs: command@HH:MM[:SS][+days_ahead] (commands: book-free, book-spot, show-bookings).",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    default=int(os.environ.get("BOOK_FREE_CONCURRENCY", 1)),
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of days to book in parallel by book-free jobs."
+)
+@click.option(
+    "-r",
+    "--race",
+    default=int(os.environ.get("BOOK_SPOT_RACE", 1)),
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of top preferred spots to request at once by booking jobs."
+)
+@click.pass_context
+def daemon(ctx, schedule, concurrency, race):
+    """Run scheduled jobs with a warm session."""
+    import signal
+
+    from tidarator.daemon import Daemon, parse_schedule
+
+    logging.info("run_daemon")
+    config = ctx.obj["config"]
+    try:
+        jobs = parse_schedule(schedule)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    unknown = [job.command for job in jobs if job.command not in ("book-free", "book-spot", "show-bookings")]
+    if not jobs or unknown:
+        raise click.UsageError(f"Schedule must list supported jobs (unknown: {unknown}).")
+
+    session = get_logged_session(config, concurrency=max(concurrency * race, AVAILABILITY_CONCURRENCY))
+    caches = get_caches(session, config)
+
+    def run_job(job, for_date):
+        logging.info(f"run_job {job} for {for_date}")
+        zone = config["book-spot"]["zone"]
+        spots = config["book-spot"]["spots"]
+        match job.command:
+            case "book-free":
+                from tidarator.spots.book_free_spots import BookFreeSpots
+
+                payload = {"zone_name": zone, "spot_name": spots, "start_from": utils.date_to_str(for_date)}
+                action = BookFreeSpots(
+                    session, payload, concurrency=concurrency, caches=caches, retry_policy=get_retry_policy(),
+                    race=race, fetch_concurrency=AVAILABILITY_CONCURRENCY,
+                )
+            case "book-spot":
+                from tidarator.spots.book_spot import BookSpot
+
+                payload = {"for_date": utils.date_to_str(for_date), "zone_name": zone, "spot_name": spots}
+                action = BookSpot(session, payload, caches=caches, retry_policy=get_retry_policy(), race=race)
+            case _:
+                from tidarator.spots.show_bookings import ShowBookings
+
+                action = ShowBookings(session, {"zone_name": zone}, caches=caches)
+        action.register_listener(log_message)
+        configure_notifiers_for_action(action, config)
+        print_result(action.do())
+        export_metrics()
+        export_trace()
+
+    runner = Daemon(
+        session,
+        jobs,
+        run_job,
+        token_refresh_interval=int(os.environ.get("DAEMON_TOKEN_REFRESH", 600)),
+        warm_up_connections=concurrency,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: runner.stop())
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        runner.stop()
+
+
+@cli.command(help="Watch for spots released by others and book them.")
+@click.option(
+    "-f",
+    "--start-from",
+    default=utils.date_to_str(datetime.today()),
+    show_default=True,
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="The first day to watch.",
+)
+@click.option(
+    "--min-interval",
+    default=float(os.environ.get("WATCH_MIN_INTERVAL", 30)),
+    show_default=True,
+    type=click.FloatRange(min=1),
+    help="Shortest time (in seconds) between the polls (used right after a change).",
+)
+@click.option(
+    "--max-interval",
+    default=float(os.environ.get("WATCH_MAX_INTERVAL", 300)),
+    show_default=True,
+    type=click.FloatRange(min=1),
+    help="Longest time (in seconds) between the polls (reached when nothing changes for a while).",
+)
+@click.option(
+    "--rate",
+    default=float(os.environ.get("WATCH_REQUESTS_PER_MINUTE", 10)),
+    show_default=True,
+    type=click.FloatRange(min=0.1),
+    help="Max number of requests per minute.",
+)
+@click.pass_context
+def watch(ctx, start_from, min_interval, max_interval, rate):
+    """Watch for free spots and book them."""
+    import signal
+
+    from tidarator.spots.book_spot import BookSpot
+    from tidarator.watcher import Watcher
+
+    logging.info("run_watch")
+    config = ctx.obj["config"]
+    session = get_logged_session(config)
+    caches = get_caches(session, config)
+    zone = config["book-spot"]["zone"]
+
+    def book_day(day, availability=None):
+        payload = {"for_date": day, "zone_name": zone, "spot_name": config["book-spot"]["spots"]}
+        action = BookSpot(session, payload, caches=caches, retry_policy=get_retry_policy(), availability=availability)
+        action.register_listener(log_message)
+        # the watcher tries the days again and again, so only the bookings are worth a notification
+        for listener in get_notifiers(config):
+            action.register_listener(listener, "success")
+        result = action.do()
+        print_result(result)
+        return result
+
+    watcher = Watcher(
+        session,
+        caches,
+        zone,
+        book_day,
+        look_from=start_from,
+        min_interval=min_interval,
+        max_interval=max_interval,
+        requests_per_minute=rate,
+        spot_names=config["book-spot"]["spots"],
+    )
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+
+@cli.command(help="Run a command for all the accounts listed in the accounts file.")
+@click.argument("command", type=click.Choice(["book-free", "book-spot", "show-bookings"]))
+@click.option(
+    "-a",
+    "--accounts-file",
+    default=ACCOUNTS_FILE,
+    show_default=True,
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="TOML file with the accounts.",
+)
+@click.option(
+    "-d",
+    "--date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Date to book (book-spot, default: today) or to start booking from "
+         "(book-free, default: today plus account's look_ahead).",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    default=ACCOUNTS_CONCURRENCY,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of accounts served in parallel.",
+)
+@click.option(
+    "--allocate",
+    is_flag=True,
+    help="book-spot, book-free: assign the free spots of every day to the accounts up front, so each account "
+         "requests one spot nobody else asks for.",
+)
+@click.pass_context
+def accounts(ctx, command, accounts_file, date, concurrency, allocate):
+    """Run a command for many accounts from one process."""
+    from tidarator.orchestrator import AccountOrchestrator
+
+    logging.info("run_accounts")
+    try:
+        account_configs = load_accounts(accounts_file)
+    except (InvalidAccountsFileError, MissingEnvironmentVariableError) as e:
+        logger.error(e)
+        click.echo(f"Error: {e}!", file=sys.stderr)
+        sys.exit(1)
+    if allocate and command == "show-bookings":
+        raise click.UsageError("--allocate works with book-spot and book-free commands only.")
+
+    allocation = None
+
+    def start_from_of(config):
+        return utils.date_to_str(date or datetime.today() + timedelta(days=config["check-spots"]["look-ahead"]))
+
+    def allocated_spots(config, day):
+        # the day's spots are allocated among the accounts that book it
+        booking = [c["account"]["name"] for c in account_configs if start_from_of(c) <= day]
+        return orchestrator.allocated_spots(config["account"]["name"], utils.str_to_date(day), booking)
+
+    def run_action(config, session, caches):
+        zone = config["book-spot"]["zone"]
+        spots = config["book-spot"]["spots"]
+        match command:
+            case "book-free":
+                from tidarator.spots.book_free_spots import BookFreeSpots
+
+                payload = {"zone_name": zone, "spot_name": spots, "start_from": start_from_of(config)}
+                action = BookFreeSpots(
+                    session, payload, caches=caches, retry_policy=get_retry_policy(),
+                    fetch_concurrency=AVAILABILITY_CONCURRENCY,
+                    spots_for_day=(lambda day: allocated_spots(config, day)) if allocate else None,
+                )
+            case "book-spot":
+                from tidarator.spots.book_spot import BookSpot
+
+                if allocation is not None:
+                    spot = allocation.get(config["account"]["name"])
+                    spots = [spot] if spot else []
+                payload = {"for_date": utils.date_to_str(date or datetime.today()), "zone_name": zone, "spot_name": spots}
+                action = BookSpot(session, payload, caches=caches, retry_policy=get_retry_policy())
+            case _:
+                from tidarator.spots.show_bookings import ShowBookings
+
+                action = ShowBookings(session, {"zone_name": zone}, caches=caches)
+        action.register_listener(log_message)
+        configure_notifiers_for_action(action, config)
+        return action.do()
+
+    orchestrator = AccountOrchestrator(
+        account_configs,
+        lambda config: get_logged_session(config, secrets_file=get_secrets_file(config)),
+        get_caches,
+        concurrency=concurrency,
+    )
+    if allocate and command == "book-spot":
+        allocation = orchestrator.allocate(date or datetime.today())
+    print_result(orchestrator.run(run_action, command))
+
+
+@cli.command(help="Clear cached zones and spot IDs, so they are fetched again.")
+@click.pass_context
+def clear_cache(ctx):
+    """Clear the on-disk cache."""
+    logging.info("run_clear_cache")
+    cache = get_persistent_cache(ctx.obj["config"])
+    if cache:
+        cache.invalidate()
+    click.echo("Cache cleared.")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,36 @@
+import functools
+
+from .. import tracing
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _traced(cls, method):
+    """
+    Make every run of the action's method a tracing span, with the payload the action runs for as its attributes.
+    """
+    name = f"{cls.__name__}.{method.__name__}"
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with tracing.span(name, "action", args[0] if args else self.payload):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class ParkanizerActionBase(object):
 
+    # the methods running the action (for the whole payload or one of many payloads), traced as spans
+    TRACED_METHODS = ("do", "do_for_payload")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.TRACED_METHODS:
+            if name in cls.__dict__:
+                setattr(cls, name, _traced(cls, cls.__dict__[name]))
+
     def __init__(self, session, payload: dict):
         """
         Initialize the class with the session object (used to communicate with the server) and the payload,
@@ -76,7 +107,9 @@ class ParkanizerActionBase(object):
         """
         if event_type in self._event_listeners:
             for listener in self._event_listeners[event_type]:
-                listener(event_type, data)
+                name = getattr(listener, "__name__", type(listener).__name__)
+                with tracing.span(f"notify {name}", "notify", {"event_type": event_type}):
+                    listener(event_type, data)
         else:
             logger.warning(f'Unknown event type: {event_type}')
 
@@ -3,14 +3,21 @@ from urllib.parse import parse_qs, urlparse
 
 import requests
 
+from ..config import PARKANIZER_API, PARKANIZER_LOGIN_URL
+
 POLICY = "B2C_1A_Parkanizer_Login"
-PARKANIZER_LOGIN_URI = "https://login.parkanizer.com/loginparkanizer.onmicrosoft.com/" + POLICY
-PARKANIZER_SHARE_URI = "https://share.parkanizer.com"
-PARKANIZER_CALLBACK_URI = "https://share.parkanizer.com/callback"
+PARKANIZER_LOGIN_URI = PARKANIZER_LOGIN_URL + "/" + POLICY
+PARKANIZER_SHARE_URI = PARKANIZER_API.removesuffix("/api")
+PARKANIZER_CALLBACK_URI = PARKANIZER_SHARE_URI + "/callback"
 
 
-def get_token(username, password):
-    session = requests.Session()
+def get_token(username, password, session=None):
+    """
+    Log in with username and password (B2C flow) and return the tokens.
+    :param session: HTTP session to use (so its connections are reused later). A new one is created if not given.
+    """
+    if session is None:
+        session = requests.Session()
 
     authorize_response = session.get(
         PARKANIZER_SHARE_URI + "/api/auth0/authorize",
@@ -52,7 +59,7 @@ def get_token(username, password):
     )
     confirm2_response.raise_for_status()
 
-    confirm2_params = parse_qs(urlparse(confirm2_response.url).query)
+    confirm2_params = parse_qs(urlparse(str(confirm2_response.url)).query)
 
     get_token_response = session.post(
         PARKANIZER_SHARE_URI + "/api/auth0/get-token",
@@ -0,0 +1,214 @@
+"""
+Recording of the service's responses (a "cassette") and serving them back, so the commands can be run (and measured)
+repeatably without the network.
+
+The cassette is a JSON lines file (gzip-compressed if its name ends with `.gz`), one request with its response
+per line. Bearer and refresh tokens are never written: they are replaced with a placeholder.
+"""
+import base64
+import gzip
+import json
+import pathlib
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from ..config import PARKANIZER_API
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+REDACTED = "REDACTED"
+# the keys of the JSON bodies holding tokens
+SECRET_KEYS = {"accessToken", "refreshToken", "bearerToken", "idToken", "token"}
+# the response headers the app reads (the others aren't recorded)
+RECORDED_HEADERS = ("Content-Type", "ETag", "Set-Cookie")
+
+
+class CassetteMissError(Exception):
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        super().__init__(f"No recorded response for {method} {url}")
+
+
+def _open(path: pathlib.Path, mode: str):
+    path = pathlib.Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _redact(data, secrets: list[str]):
+    if isinstance(data, dict):
+        return {k: REDACTED if k in SECRET_KEYS and isinstance(v, str) else _redact(v, secrets) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_redact(item, secrets) for item in data]
+    if isinstance(data, str) and data in secrets:
+        return REDACTED
+    return data
+
+
+def _redact_text(text: str, secrets: list[str]) -> str:
+    try:
+        return json.dumps(_redact(json.loads(text), secrets), separators=(",", ":"))
+    except ValueError:
+        for secret in secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+
+def _redact_cookie(header: str) -> str:
+    # "refresh_token=<token>; Path=/; ..." -> "refresh_token=REDACTED; Path=/; ..."
+    name, _, rest = header.partition("=")
+    attributes = rest.partition(";")[2]
+    return f"{name}={REDACTED}" + (f";{attributes}" if attributes else "")
+
+
+def _key(method: str, url: str, payload) -> tuple[str, str, str]:
+    return method, url.removeprefix(PARKANIZER_API), json.dumps(payload, sort_keys=True)
+
+
+def placeholder_token(ttl: float = 365 * 24 * 60 * 60) -> str:
+    """
+    Return a bearer token (unsigned JWT) that stays valid for `ttl` seconds, so the replayed session is never refreshed.
+    """
+    claims = json.dumps({"sub": REDACTED, "exp": int(time.time() + ttl)}).encode()
+    return "e30." + base64.urlsafe_b64encode(claims).decode().rstrip("=") + "." + REDACTED
+
+
+class CassetteRecorder:
+    """
+    Sends the requests to the service and writes them (with the responses and their timing) to the cassette.
+    """
+
+    replaying = False
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._file = _open(self.path, "w")
+
+    def request(self, session, method: str, url: str, secrets: list[str] = (), **kwargs) -> Response:
+        """
+        Send the request with the HTTP client and record it.
+        :param secrets: The tokens to redact (wherever they appear in the response).
+        """
+        started = time.perf_counter()
+        response = session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        secrets = [s for s in secrets if s]
+        headers = {}
+        for name in RECORDED_HEADERS:
+            value = response.headers.get(name)
+            if value is not None:
+                headers[name] = _redact_cookie(value) if name == "Set-Cookie" else value
+        entry = {
+            "method": method,
+            "url": url.removeprefix(PARKANIZER_API),
+            "json": _redact(kwargs.get("json"), secrets),
+            "status": response.status_code,
+            "headers": headers,
+            "body": _redact_text(response.text, secrets) if response.content else "",
+            "offset": round(started - self._start, 6),
+            "elapsed": round(elapsed, 6),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class CassettePlayer:
+    """
+    Serves the recorded responses instead of sending the requests.
+
+    A request gets the next response recorded for the same method, URL and payload. If there is none (for example,
+    when a date in the payload differs from the recorded one), the next unused response of the same endpoint is
+    served. After the responses of a request are used up, the last one is repeated.
+    """
+
+    replaying = True
+
+    def __init__(self, path: pathlib.Path, timing: float = 1.0):
+        """
+        :param path: The cassette file.
+        :param timing: How the recorded response time is scaled (1 replays it as recorded, 0 answers at once).
+        """
+        self.path = pathlib.Path(path)
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._exact: dict[tuple, deque] = {}
+        self._by_endpoint: dict[tuple, deque] = {}
+        self._last: dict[tuple, dict] = {}
+        with _open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._exact.setdefault(_key(entry["method"], entry["url"], entry["json"]), deque()).append(entry)
+                self._by_endpoint.setdefault((entry["method"], entry["url"].partition("?")[0]), deque()).append(entry)
+        logger.info(f"Replaying {sum(len(e) for e in self._exact.values())} responses from {self.path}")
+
+    def _find(self, method: str, url: str, payload) -> dict:
+        key = _key(method, url, payload)
+        endpoint = (method, key[1].partition("?")[0])
+        with self._lock:
+            for entries in (self._exact.get(key), self._by_endpoint.get(endpoint)):
+                # skip the entries already served by the other index
+                while entries and entries[0].get("served"):
+                    entries.popleft()
+                if entries:
+                    entry = entries.popleft()
+                    entry["served"] = True
+                    self._last[key] = self._last[endpoint] = entry
+                    return entry
+            entry = self._last.get(key) or self._last.get(endpoint)
+        if entry is None:
+            raise CassetteMissError(method, url)
+        return entry
+
+    def request(self, session, method: str, url: str, secrets: list[str] = (), **kwargs) -> Response:
+        """
+        Return the recorded response for the request (the HTTP client isn't used).
+        """
+        entry = self._find(method, url, kwargs.get("json"))
+        if self.timing > 0:
+            time.sleep(entry["elapsed"] * self.timing)
+
+        response = Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        response.reason = "Replayed"
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+    def close(self):
+        pass
+
+
+def open_cassette(mode: str, path: pathlib.Path, timing: float = 1.0):
+    """
+    Return the cassette recorder or player (`mode` is "record" or "replay").
+    """
+    match mode:
+        case "record":
+            return CassetteRecorder(path)
+        case "replay":
+            return CassettePlayer(path, timing)
+        case _:
+            raise ValueError(f"Unknown cassette mode: {mode} (expected 'record' or 'replay')")
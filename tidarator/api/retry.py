@@ -0,0 +1,179 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from requests import ConnectionError, Timeout
+
+from .session_base import ParkanizerServerError
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+SUCCESS = "success"
+RETRY = "retry"
+FAIL = "fail"
+
+# errors after which the request may be repeated (the request might have been processed by the server, though)
+TRANSIENT_ERRORS = (ParkanizerServerError, ConnectionError, Timeout)
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Tell if the request may be repeated after the error. The transport errors of the HTTP/2 client (httpx) count,
+    too; they can only occur if httpx (an optional dependency) has been imported, so it's not imported here.
+    """
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+def classify_take_spot(response: dict = None, error: Exception = None) -> str:
+    """
+    Classify `take_spot` outcome:
+    - a reservation is a success,
+    - any other regular response (for example: the spot is already taken) is final, repeating it won't help,
+    - transient errors (5xx, connection problems, timeouts) are worth retrying.
+    """
+    if error is not None:
+        return RETRY if is_transient(error) else FAIL
+    return SUCCESS if response.get("status") == "Reserved" else FAIL
+
+
+class RetryBudget:
+    """
+    Limits the total number of retries (shared by many calls), so a failing service isn't flooded with requests.
+    """
+
+    def __init__(self, max_retries: int):
+        self.remaining = max_retries
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class RetryOutcome:
+    """
+    Result of a call made according to `RetryPolicy`.
+    """
+
+    def __init__(self, response=None, error: Exception = None, attempts: int = 0, ambiguous: bool = False):
+        """
+        :param response: The last (or the successful) response.
+        :param error: The last error, if no response was received.
+        :param attempts: Number of requests sent (including hedged ones).
+        :param ambiguous: True if some request failed in a way that doesn't tell whether the server processed it.
+        """
+        self.response = response
+        self.error = error
+        self.attempts = attempts
+        self.ambiguous = ambiguous
+
+    def __repr__(self):
+        return (f"RetryOutcome(response={self.response}, error={self.error!r}, attempts={self.attempts}, "
+                f"ambiguous={self.ambiguous})")
+
+
+class RetryPolicy:
+    """
+    Repeats calls that failed transiently, with jittered exponential backoff.
+
+    Optionally, the calls are hedged: if there is no response within `hedge_after` seconds,
+    a duplicate request is sent and the first useful response wins.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 2.0,
+                 hedge_after: float = None, budget: RetryBudget = None, classify=classify_take_spot):
+        """
+        :param max_attempts: Max number of attempts per call (1 means no retries).
+        :param base_delay: Delay (in seconds) before the first retry; it doubles with each next retry.
+        :param max_delay: Max delay (in seconds) between the retries.
+        :param hedge_after: Send a duplicate request if there is no response after this time (in seconds).
+        :param budget: Retry budget shared by the calls (unlimited if not given).
+        :param classify: Callable(response=None, error=None) returning SUCCESS, RETRY or FAIL.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.budget = budget
+        self.classify = classify
+
+    def backoff(self, retry: int) -> float:
+        """
+        Delay before the given retry (1-based): "full jitter" exponential backoff.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    @staticmethod
+    def _attempt(func, args, kwargs) -> tuple:
+        try:
+            return func(*args, **kwargs), None
+        except Exception as e:
+            return None, e
+
+    def _hedged_attempt(self, func, args, kwargs) -> tuple[tuple, int, bool]:
+        """
+        Send the request and, if it's slow, its duplicate. Return the first useful result, the number of requests
+        and whether any of the requests ended without a definite answer (so the server may have processed it).
+        """
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+        try:
+            pending = {executor.submit(self._attempt, func, args, kwargs)}
+            done, pending = wait(pending, timeout=self.hedge_after)
+            if done:
+                result = next(iter(done)).result()
+                return result, 1, self.classify(*result) == RETRY
+
+            logger.info(f"No response after {self.hedge_after}s, sending a hedged request")
+            pending.add(executor.submit(self._attempt, func, args, kwargs))
+            result, ambiguous = None, False
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    verdict = self.classify(*result)
+                    if verdict == SUCCESS:
+                        return result, 2, ambiguous
+                    # e.g. the first request timed out, while the server reserved the spot for it
+                    ambiguous = ambiguous or verdict == RETRY
+            return result, 2, ambiguous
+        finally:
+            # don't wait for the slower request
+            executor.shutdown(wait=False)
+
+    def call(self, func, *args, **kwargs) -> RetryOutcome:
+        """
+        Call the function according to the policy.
+        """
+        outcome = RetryOutcome()
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                if self.budget is not None and not self.budget.acquire():
+                    logger.warning("Retry budget exhausted")
+                    break
+                delay = self.backoff(attempt - 1)
+                logger.info(f"Retrying in {delay:.3f}s (attempt {attempt}/{self.max_attempts})")
+                time.sleep(delay)
+
+            if self.hedge_after is not None:
+                (outcome.response, outcome.error), sent, ambiguous = self._hedged_attempt(func, args, kwargs)
+                outcome.ambiguous = outcome.ambiguous or ambiguous
+            else:
+                (outcome.response, outcome.error), sent = self._attempt(func, args, kwargs), 1
+            outcome.attempts += sent
+
+            verdict = self.classify(outcome.response, outcome.error)
+            if verdict == RETRY:
+                outcome.ambiguous = True
+                logger.warning(f"Attempt {attempt} failed: {outcome.error}")
+                continue
+            break
+        return outcome
@@ -1,35 +1,73 @@
+import hashlib
+import pathlib
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 
-from requests import Session
+from requests import Response, Session
 
 from . import auth
-from ..config import SESSION_SECRETS_DIR
+from .cassette import REDACTED, placeholder_token
+from .token_manager import TokenManager
+from .transport import TransportConfig, create_http_session
+from ..config import PARKANIZER_API, SESSION_SECRETS_DIR
 from ..log_config import get_logger
+from .. import tracing
+from ..metrics import HttpMetrics, endpoint_of, registry
 
 logger = get_logger(__name__)
-PARKANIZER_API = "https://share.parkanizer.com/api"
+
+
+class ParkanizerServerError(Exception):
+    def __init__(self, url, status_code):
+        self.url = url
+        self.status_code = status_code
+        super().__init__(f"Server error {status_code} for {url}")
 
 
 class ParkanizerSessionBase:
-    def __init__(self):
-        self.session: Session = Session()
+    def __init__(self, transport: TransportConfig = None, secrets_file: pathlib.Path = None,
+                 metrics: HttpMetrics = None, cassette=None):
+        """
+        :param transport: HTTP client settings (pool size, timeouts, HTTP/2). Defaults are used if not given.
+        :param secrets_file: File to store the session secrets in (default: `session_secrets` in SESSION_SECRETS_DIR).
+        :param metrics: Where the timing of the HTTP calls is recorded (default: the process-wide registry).
+        :param cassette: `CassetteRecorder` to record the API calls or `CassettePlayer` to replay them
+                         (see `tidarator.api.cassette`). The service is called directly if not given.
+        """
+        self.transport = transport if transport is not None else TransportConfig()
+        self.secrets_file = secrets_file if secrets_file is not None else SESSION_SECRETS_DIR / "session_secrets"
+        self.metrics = metrics if metrics is not None else registry
+        self.cassette = cassette
+        self.session: Session = create_http_session(self.transport)
+        self.bearer_token = None
+        self.refresh_token = None
+        self.token_manager = TokenManager(self)
 
     def login(self, username: str, password: str):
+        if self.cassette is not None and self.cassette.replaying:
+            # the responses are replayed, so no real login is needed (and the stored secrets are left intact)
+            self._set_secrets(placeholder_token(), REDACTED)
+            return True
+
         result = False
         try:
             logger.info("Trying to authenticate with stored secrets")
 
             # TODO should this be isolated/removed from "pure" session logic
-            with open(SESSION_SECRETS_DIR / "session_secrets", "rb") as f:
+            with open(self.secrets_file, "rb") as f:
                 session_secrets = pickle.load(f)
 
             self._set_secrets(*(session_secrets.values()))
-            self._try_refresh_token()
+            # no request is needed as long as the stored token is valid
+            if not self.token_manager.is_fresh():
+                self._try_refresh_token()
             logger.info("Successfully authenticated with stored secrets")
             result = True
-        except (FileNotFoundError, pickle.UnpicklingError, KeyError, EOFError, TypeError):
+        except (FileNotFoundError, pickle.UnpicklingError, KeyError, EOFError, TypeError, ValueError):
             logger.info("Failed to authenticate with stored secrets. Trying with normal login.")
-            session_secrets = auth.get_token(username, password)
+            # the stale token (header and cookie) must not be sent to the login pages
+            self._clear_secrets()
+            session_secrets = auth.get_token(username, password, session=self.session)
             logger.info("Authenticated with username and password")
             self._set_secrets(*(session_secrets.values()))
             result = True
@@ -37,30 +75,113 @@ class ParkanizerSessionBase:
         if not result:
             raise Exception("Failed to authenticate with username and password")
         else:
-            with open(SESSION_SECRETS_DIR / "session_secrets", "wb") as f:
-                pickle.dump(session_secrets, f)
+            self.store_secrets()
+            self.token_manager.start()
         return result
 
+    def store_secrets(self):
+        """
+        Store current secrets, so the next login can reuse them.
+        """
+        with open(self.secrets_file, "wb") as f:
+            pickle.dump({"bearer_token": self.bearer_token, "refresh_token": self.refresh_token}, f)
+
     def _try_refresh_token(self):
         url = PARKANIZER_API + "/auth0/try-refresh-token"
-        response = self.session.post(url, json={})
+        response = self._send("POST", url, json={})
         self._set_secrets(response.json()["newTokenOrNull"]["accessToken"], response.cookies["refresh_token"], )
 
+    def warm_up(self, connections: int = 1):
+        """
+        Open (or refresh) connections to the service, so the next requests don't pay for TCP/TLS handshake.
+        :param connections: How many connections to open (the number of requests that will be sent concurrently).
+        """
+
+        def _head(_):
+            try:
+                self._send("HEAD", PARKANIZER_API)
+            except Exception as e:
+                logger.warning(f"Couldn't warm up the connection: {e}")
+
+        connections = min(connections, self.transport.pool_size)
+        if connections <= 1:
+            _head(0)
+            return
+        # concurrent requests make the pool open as many connections
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(_head, range(connections)))
+
     def get_my_context(self):
         url = PARKANIZER_API + "/get-employee-context"
         payload = {}
         return self._post(url, payload)
 
+    def _send(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Send the request with the HTTP client, recording its timing in the metrics (and a tracing span).
+        """
+        with tracing.span(f"{method} {endpoint_of(url)}", "http") as span, self.metrics.timed(method, url) as call:
+            if self.cassette is not None:
+                secrets = [self.bearer_token, self.refresh_token]
+                response = self.cassette.request(self.session, method, url, secrets=secrets, **kwargs)
+            else:
+                response = self.session.request(method, url, **kwargs)
+            call.status = response.status_code
+            span.set_attribute("status", response.status_code)
+        return response
+
+    def _request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        Send the request. If the service rejects the token, refresh it and retry the request once.
+        Server errors (5xx) are raised as `ParkanizerServerError`, so they can't be mistaken for a regular response.
+        """
+        token = self.bearer_token
+        response = self._send(method, url, **kwargs)
+        if response.status_code == 401 and self.token_manager.refresh(stale_token=token):
+            logger.info(f"Retrying {url} with refreshed token")
+            self.metrics.count_retry(url, "unauthorized")
+            response = self._send(method, url, **kwargs)
+        if response.status_code >= 500:
+            raise ParkanizerServerError(url, response.status_code)
+        return response
+
     def _post(self, url, payload=None) -> dict:
-        response = self.session.post(url, json=payload)
+        response = self._request("POST", url, json=payload)
         if response.text:
             return response.json()
         else:
             return {}
 
+    def _post_if_changed(self, url, payload=None, validator: str = None) -> tuple[dict | None, str]:
+        """
+        Post the request and return the response data with its validator: the ETag or, if the service doesn't send
+        one, a hash of the body. If the response hasn't changed since the one the validator was taken from,
+        return None instead of the data (the body isn't parsed then).
+        """
+        headers = {}
+        if validator and not validator.startswith("blake2b:"):
+            headers["If-None-Match"] = validator
+        response = self._request("POST", url, json=payload, headers=headers)
+        if response.status_code == 304:
+            return None, validator
+
+        etag = response.headers.get("ETag")
+        new_validator = etag if etag else "blake2b:" + hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        if new_validator == validator:
+            return None, validator
+        return (response.json() if response.content else {}), new_validator
+
     def _get(self, url) -> dict:
-        return self.session.get(url).json()
+        return self._request("GET", url).json()
 
     def _set_secrets(self, bearer_token, access_token):
+        self.bearer_token = bearer_token
+        self.refresh_token = access_token
         self.session.headers.update({"Authorization": "Bearer " + bearer_token})
         self.session.cookies.update({"refresh_token": access_token})
+
+    def _clear_secrets(self):
+        self.bearer_token = None
+        self.refresh_token = None
+        self.session.headers.pop("Authorization", None)
+        self.session.cookies.clear()
@@ -1,16 +1,20 @@
 import io
+import pathlib
 from datetime import datetime, timedelta
 
 from . import utils
 from .session_base import ParkanizerSessionBase, PARKANIZER_API
+from .transport import TransportConfig
 from ..log_config import get_logger
+from ..metrics import HttpMetrics
 
 logger = get_logger(__name__)
 
 
 class ParkanizerDeskSession(ParkanizerSessionBase):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, transport: TransportConfig = None, secrets_file: pathlib.Path = None,
+                 metrics: HttpMetrics = None, cassette=None):
+        super().__init__(transport, secrets_file, metrics, cassette)
         self.GET_ZONES_URL = PARKANIZER_API + "/employee-desks/desk-marketplace/get-marketplace-zones"
         self.GET_EMPLOYEES_URL = PARKANIZER_API + "/employee-reservations/get-employees"
         self.GET_DESK_ZONE_MAP_URL = PARKANIZER_API + "/employee-desks/desk-marketplace/get-marketplace-desk-zone-map"
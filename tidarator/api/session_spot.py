@@ -1,8 +1,11 @@
+import pathlib
 from datetime import datetime, timedelta
 
 from . import utils
 from .session_base import ParkanizerSessionBase, PARKANIZER_API
+from .transport import TransportConfig
 from ..log_config import get_logger
+from ..metrics import HttpMetrics
 
 logger = get_logger(__name__)
 
@@ -27,8 +30,9 @@ class ParkanizerSpotSession(ParkanizerSessionBase):
     parking-related tasks effectively.
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, transport: TransportConfig = None, secrets_file: pathlib.Path = None,
+                 metrics: HttpMetrics = None, cassette=None):
+        super().__init__(transport, secrets_file, metrics, cassette)
         # marketplace/get-parking-spot-zones
         self.GET_EMPLOYEES_URL = PARKANIZER_API + "/employee-reservations/get-employees"
         self.GET_ZONES_URL = PARKANIZER_API + "/marketplace/get-parking-spot-zones"
@@ -80,8 +84,22 @@ class ParkanizerSpotSession(ParkanizerSessionBase):
 
         return self._post(self.GET_SPOTS_MAP_URL, payload)
 
-    def take_spot(self, zone_id: str, spot_id: str, day: datetime | str):
-        logger.info(f'Taking Spot {spot_id} for {day} (in {zone_id})')
+    def get_spots_map_if_changed(self, zone_id: str, for_date: datetime, validator: str = None):
+        """
+        Like `get_spots_map`, but return (None, validator) if the map hasn't changed since the given validator.
+        :return: (map or None, validator of the returned map)
+        """
+        payload = {
+            "parkingSpotZoneId": zone_id,
+            "date": utils.date_to_str(for_date),
+            "bookingTimeInterval": {"fromBookingTime": "P0DT00H00M", "toBookingTime": "P1DT00H00M"}
+        }
+        return self._post_if_changed(self.GET_SPOTS_MAP_URL, payload, validator)
+
+    def take_spot_payload(self, zone_id: str, spot_id: str, day: datetime | str) -> dict:
+        """
+        Build `take_spot` request payload (so it can be prepared ahead of time).
+        """
         # if day is instance of datetime, convert to string:
         if type(day) is datetime:
             day = utils.date_to_str(day)
@@ -94,6 +112,16 @@ class ParkanizerSpotSession(ParkanizerSessionBase):
         # if no spot_id is provided, parkanizer will try to book any spot available (the payload then does not include parkingSpotIdOrNull field
         if not spot_id:
             del payload['parkingSpotIdOrNull']
+        return payload
+
+    def take_spot(self, zone_id: str, spot_id: str, day: datetime | str):
+        logger.info(f'Taking Spot {spot_id} for {day} (in {zone_id})')
+        return self.take_spot_with_payload(self.take_spot_payload(zone_id, spot_id, day))
+
+    def take_spot_with_payload(self, payload: dict):
+        """
+        Send `take_spot` request with a payload built by `take_spot_payload`.
+        """
         return self._post(self.TAKE_SPOT_URL, payload)
 
     def release_spot(self, day: datetime | str):
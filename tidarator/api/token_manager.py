@@ -0,0 +1,103 @@
+import base64
+import json
+import threading
+import time
+
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def decode_expiry(bearer_token: str) -> float | None:
+    """
+    Return expiry time (unix timestamp) of a JWT bearer token, or None if it can't be decoded.
+    """
+    try:
+        payload = bearer_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+class TokenManager:
+    """
+    Takes care of the session's bearer token lifecycle.
+
+    The token is refreshed only when it is about to expire (`refresh_margin` seconds before the expiry),
+    in the background (so requests on the critical path don't wait for it), or after the service rejected it.
+    """
+
+    def __init__(self, session, refresh_margin: float = 120):
+        """
+        :param session: `ParkanizerSessionBase` object whose token is managed.
+        :param refresh_margin: How long (in seconds) before the expiry the token is refreshed.
+        """
+        self.session = session
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def expires_at(self) -> float | None:
+        return decode_expiry(self.session.bearer_token) if self.session.bearer_token else None
+
+    def is_fresh(self) -> bool:
+        """
+        Check if the token is valid for at least `refresh_margin` seconds.
+        """
+        expires_at = self.expires_at
+        return expires_at is not None and expires_at - time.time() > self.refresh_margin
+
+    def refresh(self, stale_token: str = None) -> bool:
+        """
+        Refresh the token. Return True if it was refreshed.
+        :param stale_token: The token a request failed with. If it was already replaced (by a concurrent refresh),
+                            the token is not refreshed again.
+        """
+        with self._lock:
+            if stale_token is not None and stale_token != self.session.bearer_token:
+                return True
+            try:
+                self.session._try_refresh_token()
+                self.session.store_secrets()
+                logger.info("Session token refreshed")
+                return True
+            except Exception as e:
+                logger.error(f"Couldn't refresh the session token: {e}")
+                return False
+            finally:
+                self._schedule()
+
+    def ensure_fresh(self):
+        """
+        Refresh the token only if it is about to expire.
+        """
+        if not self.is_fresh():
+            self.refresh()
+
+    def _schedule(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        expires_at = self.expires_at
+        if expires_at is None:
+            return
+        # don't retry too eagerly when refreshing fails
+        delay = max(expires_at - time.time() - self.refresh_margin, 30)
+        self._timer = threading.Timer(delay, self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def start(self):
+        """
+        Start refreshing the token in the background shortly before it expires.
+        """
+        with self._lock:
+            self._schedule()
+
+    def stop(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
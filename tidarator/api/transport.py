@@ -0,0 +1,87 @@
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class TransportConfig:
+    """
+    Settings of the HTTP client used to talk to the Parkanizer service.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 keep_alive: bool = True, http2: bool = False):
+        """
+        :param pool_size: Max number of connections kept per host (should match the number of concurrent requests).
+        :param connect_timeout: Time (in seconds) to wait for a connection.
+        :param read_timeout: Time (in seconds) to wait for the server's response.
+        :param keep_alive: Whether connections are reused between requests.
+        :param http2: Use HTTP/2 client (requires `httpx[http2]` package).
+        """
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+        self.http2 = http2
+
+    def __repr__(self):
+        return (f"TransportConfig(pool_size={self.pool_size}, connect_timeout={self.connect_timeout}, "
+                f"read_timeout={self.read_timeout}, keep_alive={self.keep_alive}, http2={self.http2})")
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter applying default timeouts to requests that don't set their own
+    (`requests` waits forever by default).
+    """
+
+    def __init__(self, timeout: tuple[float, float], **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _create_httpx_client(config: TransportConfig):
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("HTTP/2 transport requires httpx package (pip install 'tidarator[http2]')")
+
+    # httpx.Client offers the subset of requests.Session interface the app uses (request/get/post, headers, cookies)
+    return httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        limits=httpx.Limits(
+            max_connections=config.pool_size,
+            max_keepalive_connections=config.pool_size if config.keep_alive else 0,
+        ),
+    )
+
+
+def create_http_session(config: TransportConfig = None):
+    """
+    Create HTTP client (session) configured according to the transport settings.
+    """
+    config = config if config is not None else TransportConfig()
+    logger.debug(f"Creating HTTP session: {config}")
+    if config.http2:
+        return _create_httpx_client(config)
+
+    session = Session()
+    adapter = TimeoutHTTPAdapter(
+        timeout=(config.connect_timeout, config.read_timeout),
+        pool_connections=config.pool_size,
+        pool_maxsize=config.pool_size,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
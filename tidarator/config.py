@@ -1,5 +1,6 @@
 import os
 import pathlib
+import tomllib
 
 
 class MissingEnvironmentVariableError(Exception):
@@ -8,6 +9,12 @@ class MissingEnvironmentVariableError(Exception):
         super().__init__(f"Missing environment variable: {env_name}")
 
 
+class InvalidAccountsFileError(Exception):
+    def __init__(self, path, reason):
+        self.path = path
+        super().__init__(f"Invalid accounts file {path}: {reason}")
+
+
 def get_env_or_crash(env_name):
     env = os.environ.get(env_name)
     if not env:
@@ -23,11 +30,50 @@ def get_path_or_default(env_name, default=None):
         return default
 
 
+# the service's address (may point at a local stand-in, see `tidarator.fake_server`)
+PARKANIZER_API = os.environ.get("PARKANIZER_API", "https://share.parkanizer.com/api").rstrip("/")
+PARKANIZER_LOGIN_URL = os.environ.get(
+    "PARKANIZER_LOGIN_URL", "https://login.parkanizer.com/loginparkanizer.onmicrosoft.com"
+).rstrip("/")
+
 # for quicker logging process, after successful login the secrets are stored in a file to be reused next time
 # in current implementation the file resides in the same folder as the main package (tidarator)
 SESSION_SECRETS_DIR = get_path_or_default("SESSION_SECRETS_DIR", pathlib.Path(__file__).parents[0].resolve())
 LOGGING_CONFIG_PATH = get_path_or_default("LOGGING_CONFIG_PATH", "logging.toml")
 LOG_DIR = get_path_or_default("LOG_DIR", pathlib.Path(__file__).parents[1].resolve())
+# zones and spot IDs rarely change, so they are cached on disk (for CACHE_TTL seconds) between the runs
+CACHE_DIR = get_path_or_default("CACHE_DIR", SESSION_SECRETS_DIR)
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 7 * 24 * 60 * 60))
+# bookings (free spots, my reservations) change all the time, so they are cached only briefly and in memory
+BOOKINGS_CACHE_TTL = int(os.environ.get("BOOKINGS_CACHE_TTL", 60))
+
+# how many days' spots state is fetched at once (by book-free)
+AVAILABILITY_CONCURRENCY = int(os.environ.get("AVAILABILITY_CONCURRENCY", 4))
+
+# how take_spot requests are retried (TAKE_SPOT_HEDGE_AFTER enables hedged requests, in seconds)
+TAKE_SPOT_MAX_ATTEMPTS = int(os.environ.get("TAKE_SPOT_MAX_ATTEMPTS", 3))
+TAKE_SPOT_RETRY_BUDGET = int(os.environ.get("TAKE_SPOT_RETRY_BUDGET", 20))
+TAKE_SPOT_HEDGE_AFTER = float(os.environ["TAKE_SPOT_HEDGE_AFTER"]) if os.environ.get("TAKE_SPOT_HEDGE_AFTER") else None
+
+# HTTP client settings
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+HTTP2 = os.environ.get("HTTP2", "").lower() in ("1", "true", "yes")
+# file the timing of the HTTP calls is written to after every command (`.prom` for Prometheus text format, JSON otherwise)
+METRICS_FILE = get_path_or_default("METRICS_FILE")
+# file the tracing spans of a run are written to (Chrome trace format), tracing is off if not set
+TRACE_FILE = get_path_or_default("TRACE_FILE")
+
+# record the service's responses to CASSETTE_FILE or replay them from it (CASSETTE_MODE is "record" or "replay"),
+# replayed responses take their recorded time multiplied by CASSETTE_TIMING (0 serves them at once)
+CASSETTE_MODE = os.environ.get("CASSETTE_MODE", "").lower() or None
+CASSETTE_FILE = get_path_or_default("CASSETTE_FILE", pathlib.Path("cassette.jsonl.gz"))
+CASSETTE_TIMING = float(os.environ.get("CASSETTE_TIMING", 1))
+
+# many accounts served by one process (see `accounts` command)
+ACCOUNTS_FILE = get_path_or_default("ACCOUNTS_FILE", pathlib.Path("accounts.toml"))
+ACCOUNTS_CONCURRENCY = int(os.environ.get("ACCOUNTS_CONCURRENCY", 4))
 
 
 def parse_notifiers():
@@ -46,10 +92,13 @@ def parse_notifiers():
     return notifiers
 
 
-def load_config():
-    spots_env = get_env_or_crash("SPOT_NAMES")
+def parse_spot_names(spots_value: str) -> list[str]:
     # cleanup the names (trim, remove surrounding quotes)
-    spots = [name.strip().strip("'") for name in spots_env.split(",") if name.strip()]
+    return [name.strip().strip("'") for name in spots_value.split(",") if name.strip()]
+
+
+def load_config():
+    spots = parse_spot_names(get_env_or_crash("SPOT_NAMES"))
 
     notifiers = parse_notifiers()
 
@@ -68,3 +117,69 @@ def load_config():
     }
 
     return config
+
+
+def load_accounts(path) -> list[dict]:
+    """
+    Load many accounts from a TOML file. Values in `[defaults]` table apply to every `[[accounts]]` entry:
+
+        [defaults]
+        zone = "Parking A"
+        spots = ["*"]
+
+        [[accounts]]
+        name = "alice"                    # optional, defaults to the user
+        user = "alice@example.com"
+        password_env = "ALICE_PASSWORD"   # or `password = "..."`
+        spots = ["25", "08", "*"]         # or "25,08,*"
+        look_ahead = 7
+        tenant = "acme"                   # accounts of one tenant share zones and spot IDs (default: "default")
+        notify = "alice@example.com"      # recipient(s) of the account's notifications (default: NOTIFIERS_GMAIL_RECIPIENT)
+
+    Every account is returned in the shape of `load_config()` result, with additional `account` section.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        raise InvalidAccountsFileError(path, e)
+
+    defaults = data.get("defaults", {})
+    notifiers = parse_notifiers()
+    accounts = []
+    for number, entry in enumerate(data.get("accounts", []), start=1):
+        entry = {**defaults, **entry}
+        missing = [key for key in ("user", "zone", "spots") if not entry.get(key)]
+        if not entry.get("password") and not entry.get("password_env"):
+            missing.append("password")
+        if missing:
+            raise InvalidAccountsFileError(path, f"account #{number} misses: {', '.join(missing)}")
+
+        spots = entry["spots"]
+        account_notifiers = {notifier: dict(settings) for notifier, settings in notifiers.items()}
+        if entry.get("notify") and "gmail" in account_notifiers:
+            notify = entry["notify"]
+            account_notifiers["gmail"]["recipient"] = notify if isinstance(notify, str) else ",".join(notify)
+        accounts.append({
+            "account": {
+                "name": entry.get("name", entry["user"]),
+                "tenant": entry.get("tenant", "default"),
+            },
+            "tidaro": {
+                "user": entry["user"],
+                "password": entry.get("password") or get_env_or_crash(entry["password_env"])
+            },
+            'book-spot': {
+                "zone": entry["zone"],
+                "spots": parse_spot_names(spots) if isinstance(spots, str) else [str(s) for s in spots]
+            },
+            'check-spots': {'look-ahead': int(entry.get("look_ahead", 0))},
+            'notifiers': account_notifiers
+        })
+
+    if not accounts:
+        raise InvalidAccountsFileError(path, "no accounts defined")
+    names = [a["account"]["name"] for a in accounts]
+    if len(set(names)) != len(names):
+        raise InvalidAccountsFileError(path, "account names must be unique")
+    return accounts
@@ -0,0 +1,126 @@
+import re
+import threading
+import time
+from datetime import datetime, time as day_time, timedelta
+
+from .log_config import get_logger
+
+logger = get_logger(__name__)
+
+_JOB_PATTERN = re.compile(r"^(?P<command>[\w-]+)@(?P<at>\d{1,2}:\d{2}(:\d{2})?)(\+(?P<days_ahead>\d+))?$")
+
+
+class ScheduledJob:
+    """
+    A job run by the daemon every day at a given time.
+    """
+
+    def __init__(self, command: str, at: day_time, days_ahead: int = 0):
+        """
+        :param command: Name of the command to run (for example `book-free`).
+        :param at: Time of the day to run the command at.
+        :param days_ahead: How many days from the day of the run the command targets (for example the day to book).
+        """
+        self.command = command
+        self.at = at
+        self.days_ahead = days_ahead
+
+    def next_run(self, now: datetime) -> datetime:
+        run = datetime.combine(now.date(), self.at)
+        return run if run > now else run + timedelta(days=1)
+
+    def __repr__(self):
+        return f"{self.command}@{self.at.isoformat()}+{self.days_ahead}"
+
+
+def parse_schedule(spec: str) -> list[ScheduledJob]:
+    """
+    Parse comma-separated schedule, where each entry is `command@HH:MM[:SS][+days_ahead]`,
+    for example: `book-spot@00:00:05+14,book-free@07:30`.
+    """
+    jobs = []
+    for entry in [e.strip() for e in spec.split(",") if e.strip()]:
+        match = _JOB_PATTERN.match(entry)
+        if not match:
+            raise ValueError(f"Invalid schedule entry: {entry}")
+        hour, minute, *second = (int(part) for part in match["at"].split(":"))
+        at = day_time(hour, minute, second[0] if second else 0)
+        jobs.append(ScheduledJob(match["command"], at, int(match["days_ahead"] or 0)))
+    return jobs
+
+
+class Daemon:
+    """
+    Keeps the logged-in session (and the caches) warm and runs the scheduled jobs.
+
+    The session's token is checked periodically (and refreshed if it's about to expire), so it is ready to use
+    when a job starts, and the connection is warmed up shortly before each job.
+    """
+
+    # how long before a job the connection is warmed up
+    WARM_UP_LEAD = 5.0
+
+    def __init__(self, session, jobs: list[ScheduledJob], run_job, token_refresh_interval: float = 600,
+                 warm_up_connections: int = 1):
+        """
+        :param session: Logged-in session object shared by all the jobs.
+        :param jobs: The jobs to run.
+        :param run_job: Callable that takes a `ScheduledJob` and the day it runs for, and runs it.
+        :param token_refresh_interval: How often (in seconds) the session's token is checked.
+        :param warm_up_connections: How many connections to open before a job (its number of concurrent requests).
+        """
+        self.session = session
+        self.jobs = jobs
+        self.run_job = run_job
+        self.token_refresh_interval = token_refresh_interval
+        self.warm_up_connections = warm_up_connections
+        self._stop = threading.Event()
+        self._last_refresh = time.monotonic()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_session(self):
+        self.session.token_manager.ensure_fresh()
+        self._last_refresh = time.monotonic()
+
+    def _sleep_until(self, moment: datetime) -> bool:
+        """
+        Sleep until the moment, keeping the session token fresh meanwhile. Return False if the daemon was stopped.
+        """
+        while not self._stop.is_set():
+            remaining = (moment - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            until_refresh = self._last_refresh + self.token_refresh_interval - time.monotonic()
+            if until_refresh <= 0:
+                self._refresh_session()
+                continue
+            self._stop.wait(min(remaining, until_refresh))
+        return False
+
+    def run(self):
+        logger.info(f"Daemon started with jobs: {self.jobs}")
+        # every job's next run is moved forward only after the job has run, so the jobs due at the same time
+        # (or while another job runs) run one after another instead of being skipped
+        started = datetime.now()
+        schedule = [[job.next_run(started), i, job] for i, job in enumerate(self.jobs)]
+        while not self._stop.is_set():
+            entry = min(schedule, key=lambda e: (e[0], e[1]))
+            run_at, _, job = entry
+            logger.info(f"Next job: {job} at {run_at}")
+
+            if run_at > datetime.now():
+                if not self._sleep_until(run_at - timedelta(seconds=self.WARM_UP_LEAD)):
+                    break
+                self.session.warm_up(connections=self.warm_up_connections)
+                if not self._sleep_until(run_at):
+                    break
+
+            for_date = run_at + timedelta(days=job.days_ahead)
+            try:
+                self.run_job(job, for_date)
+            except Exception as e:
+                logger.exception(f"Job {job} failed: {e}")
+            entry[0] = job.next_run(run_at)
+        logger.info("Daemon stopped")
@@ -0,0 +1,520 @@
+"""
+Local stand-in for the Parkanizer service, to measure and test the app without touching the production service.
+
+    python -m tidarator.fake_server --port 8765 --latency 0.05 --contention 0.2 --error-rate 0.05
+
+Point the app at it (with a separate secrets directory, so the production session isn't overwritten):
+
+    PARKANIZER_API=http://127.0.0.1:8765/api PARKANIZER_LOGIN_URL=http://127.0.0.1:8765/login \\
+        SESSION_SECRETS_DIR=/tmp/fake-parkanizer SPOT_ZONE="Zone A" python tictl.py show-spots
+
+Any user name and password are accepted. `GET /_stats` returns the number of requests per endpoint,
+`POST /_reset` brings back the initial spots and reservations (and resets the statistics).
+It's a development tool (used by the tests and benchmarks): run it from the source tree, it's not in the package.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+POLICY = "B2C_1A_Parkanizer_Login"
+
+
+def _jwt(claims: dict) -> str:
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.{secrets.token_urlsafe(8)}"
+
+
+class FakeParkanizerState:
+    """
+    Zones, spots and reservations of the fake service.
+
+    Spots are taken either by the users of the fake service (reservations) or by simulated "other bookers".
+    """
+
+    def __init__(self, zones: int = 2, spots: int = 20, days: int = 14, occupancy: float = 0.5,
+                 contention: float = 0.0, token_ttl: float = 3600, seed: int = None):
+        """
+        :param zones: Number of zones (named "Zone A", "Zone B", ...).
+        :param spots: Number of spots per zone (named "01", "02", ...).
+        :param days: Number of days (from today) that can be booked.
+        :param occupancy: Fraction of spots initially taken by other bookers.
+        :param contention: Probability that another booker takes the requested spot just before the request.
+        :param token_ttl: Lifetime (in seconds) of the issued access tokens.
+        :param seed: Seed of the random generator (for repeatable runs).
+        """
+        self.zone_count = zones
+        self.spot_count = spots
+        self.day_count = days
+        self.occupancy = occupancy
+        self.contention = contention
+        self.token_ttl = token_ttl
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.access_tokens = {}
+        self.refresh_tokens = {}
+        self.pending_logins = {}
+        self.codes = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Bring back the initial spots and reservations (the logged-in users stay logged in).
+        """
+        with self.lock:
+            self.random = random.Random(self.seed)
+            self.zones = [{"id": f"zone-{i}", "name": f"Zone {chr(ord('A') + i)}"} for i in range(self.zone_count)]
+            self.zone_names = {zone["id"]: zone["name"] for zone in self.zones}
+            self.spots = {
+                zone["id"]: [{"id": f"{zone['id']}-spot-{n:02d}", "name": f"{n:02d}"}
+                             for n in range(1, self.spot_count + 1)]
+                for zone in self.zones
+            }
+            # spots taken by other bookers, per (zone, day)
+            self.taken = {
+                (zone["id"], day): {spot["id"] for spot in self.spots[zone["id"]]
+                                    if self.random.random() < self.occupancy}
+                for zone in self.zones for day in self.days()
+            }
+            # reservations of the users: (user, day) -> (zone id, spot)
+            self.reservations = {}
+            self.requests = Counter()
+
+    def days(self) -> list[str]:
+        today = date.today()
+        return [(today + timedelta(days=offset)).isoformat() for offset in range(self.day_count)]
+
+    # tokens
+
+    def issue_tokens(self, user: str) -> tuple[str, str]:
+        access_token = _jwt({"sub": user, "exp": int(time.time() + self.token_ttl)})
+        refresh_token = secrets.token_urlsafe(16)
+        self.access_tokens[access_token] = (user, time.time() + self.token_ttl)
+        self.refresh_tokens[refresh_token] = user
+        return access_token, refresh_token
+
+    def user_of(self, access_token: str) -> str | None:
+        user, expires_at = self.access_tokens.get(access_token, (None, 0))
+        return user if expires_at > time.time() else None
+
+    # spots
+
+    def _reserved_by_users(self, zone_id: str, day: str) -> set[str]:
+        return {spot["id"] for (_, d), (z, spot) in self.reservations.items() if d == day and z == zone_id}
+
+    def free_spots(self, zone_id: str, day: str) -> list[dict]:
+        unavailable = self.taken.get((zone_id, day), set()) | self._reserved_by_users(zone_id, day)
+        return [spot for spot in self.spots.get(zone_id, []) if spot["id"] not in unavailable]
+
+    def get_spots(self, user: str, zone_id: str) -> dict:
+        days = []
+        with self.lock:
+            for day in self.days():
+                reservation = self.reservations.get((user, day))
+                reserved = None
+                if reservation:
+                    reserved = {**reservation[1], "parkingSpotZoneId": reservation[0],
+                                "parkingSpotZoneName": self.zone_names[reservation[0]]}
+                days.append({"day": day, "freeSpots": len(self.free_spots(zone_id, day)),
+                             "reservedParkingSpotOrNull": reserved})
+        weeks = [{"week": days[i:i + 7]} for i in range(0, len(days), 7)]
+        return {"weeks": weeks}
+
+    def get_map(self, zone_id: str, day: str) -> dict:
+        with self.lock:
+            free = {spot["id"] for spot in self.free_spots(zone_id, day)}
+            spots = [
+                {**spot, "state": "Free" if spot["id"] in free else "Taken",
+                 # the real map carries geometry the app doesn't use
+                 "x": index * 40, "y": 0, "width": 35, "height": 60, "rotation": 0}
+                for index, spot in enumerate(self.spots.get(zone_id, []))
+            ]
+        return {"mapOrNull": {"parkingSpots": spots, "imageUrl": f"/maps/{zone_id}.png"}}
+
+    def take(self, user: str, zone_id: str, spot_id: str | None, day: str) -> dict:
+        # only "Reserved" is a status known from the real service; the statuses of the rejections are made up
+        # (the app must not rely on them)
+        with self.lock:
+            if zone_id not in self.spots or day not in self.days():
+                return {"status": "DayNotAvailable", "receivedParkingSpotOrNull": None}
+            if (user, day) in self.reservations:
+                return {"status": "EmployeeAlreadyHasReservation", "receivedParkingSpotOrNull": None}
+
+            free = self.free_spots(zone_id, day)
+            if spot_id is not None:
+                free = [spot for spot in free if spot["id"] == spot_id]
+            if free and self.random.random() < self.contention:
+                # somebody else was quicker
+                self.taken[(zone_id, day)].add(self.random.choice(free)["id"] if spot_id is None else spot_id)
+                free = self.free_spots(zone_id, day) if spot_id is None else []
+            if not free:
+                return {"status": "SpotNotAvailable", "receivedParkingSpotOrNull": None}
+
+            spot = free[0]
+            self.reservations[(user, day)] = (zone_id, spot)
+            return {"status": "Reserved", "receivedParkingSpotOrNull": dict(spot)}
+
+    def release(self, user: str, days: list[str]):
+        with self.lock:
+            for day in days:
+                self.reservations.pop((user, day), None)
+
+    def reservations_of(self, user: str) -> list[dict]:
+        with self.lock:
+            return [
+                {"day": day, "parkingSpotZoneName": self.zone_names[zone_id], "parkingSpotName": spot["name"]}
+                for (u, day), (zone_id, spot) in sorted(self.reservations.items()) if u == user
+            ]
+
+    def churn(self):
+        """
+        Let one of the other bookers take or release a spot (on a random day).
+        """
+        with self.lock:
+            zone_id, day = self.random.choice(list(self.taken))
+            taken = self.taken[zone_id, day]
+            if taken and self.random.random() < 0.5:
+                taken.discard(self.random.choice(sorted(taken)))
+            else:
+                free = self.free_spots(zone_id, day)
+                if free:
+                    taken.add(self.random.choice(free)["id"])
+
+
+def _authorized(handler):
+    """
+    Make the API handler answer 401 to requests without a valid access token and pass it the user and the payload.
+    """
+
+    def wrapper(self, query):
+        user = self._user()
+        payload = self._json_body() if self.command == "POST" else {}
+        if user is None:
+            return self._send(401, b'{"message": "Unauthorized"}')
+        return handler(self, user, payload)
+
+    return wrapper
+
+
+class FakeParkanizerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, which (with delayed ACKs) would add ~40ms to every response
+    disable_nagle_algorithm = True
+    server: "FakeParkanizerServer"
+
+    # helpers
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_body(self):
+        # read the whole request, even if it's not needed, so the connection can be kept alive
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+    def _body(self) -> bytes:
+        return self.body
+
+    def _json_body(self) -> dict:
+        body = self._body()
+        return json.loads(body) if body else {}
+
+    def _cookie(self, name: str) -> str | None:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie[name].value if name in cookie else None
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, data, headers: dict = None):
+        self._send(200, json.dumps(data).encode(), headers=headers)
+
+    def _user(self) -> str | None:
+        authorization = self.headers.get("Authorization", "")
+        return self.server.state.user_of(authorization.removeprefix("Bearer "))
+
+    # dispatching
+
+    def _handle(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        self._read_body()
+        if path.startswith("/_"):
+            return self._admin(path)
+
+        self.server.state.requests[f"{self.command} {path}"] += 1
+        self.server.simulate_latency(path)
+        failure = self.server.injected_failure()
+        if failure == "drop":
+            # the client sees the connection closed without a response
+            self.close_connection = True
+            return
+        if failure == "error":
+            return self._send(503, b'{"message": "Service Unavailable (injected)"}')
+
+        handler = self.routes.get((self.command, path))
+        if handler is None and f"/{POLICY}/" in path:
+            # the login pages may be served under any prefix (see PARKANIZER_LOGIN_URL)
+            handler = self.login_routes.get((self.command, path.partition(f"/{POLICY}/")[2]))
+        if handler is None:
+            return self._send(404, b'{"message": "Not Found"}')
+        handler(self, parse_qs(url.query))
+
+    do_GET = do_POST = do_HEAD = _handle
+
+    def _admin(self, path: str):
+        if path == "/_stats":
+            return self._send_json({"requests": dict(self.server.state.requests)})
+        if path == "/_reset" and self.command == "POST":
+            self.server.state.reset()
+            return self._send_json({})
+        self._send(404)
+
+    # login (B2C flow, as used by `tidarator.api.auth.get_token`)
+
+    def authorize(self, query):
+        tx = f"StateProperties={secrets.token_urlsafe(8)}"
+        self._send(200, json.dumps({"transId": tx}, separators=(",", ":")).encode(), content_type="text/html",
+                   headers={"Set-Cookie": f"x-ms-cpim-csrf={secrets.token_urlsafe(8)}; Path=/"})
+
+    def self_asserted(self, query):
+        form = parse_qs(self._body().decode())
+        if "password" in form:
+            self.server.state.pending_logins[query["tx"][0]] = form["signInName"][0]
+        self._send_json({"status": "200", "message": ""})
+
+    def confirmed(self, query):
+        headers = {"Set-Cookie": f"x-ms-cpim-csrf={secrets.token_urlsafe(8)}; Path=/"}
+        user = self.server.state.pending_logins.pop(query["tx"][0], None)
+        if user is None:
+            return self._send(200, b"<html></html>", content_type="text/html", headers=headers)
+        code = secrets.token_urlsafe(8)
+        self.server.state.codes[code] = user
+        headers["Location"] = f"http://{self.headers['Host']}/callback?code={code}&state={secrets.token_urlsafe(4)}"
+        self._send(302, headers=headers)
+
+    def callback(self, query):
+        self._send(200, b"<html></html>", content_type="text/html")
+
+    def _send_tokens(self, user: str, wrap: bool):
+        access_token, refresh_token = self.server.state.issue_tokens(user)
+        data = {"newTokenOrNull": {"accessToken": access_token}} if wrap else {"accessToken": access_token}
+        self._send_json(data, headers={"Set-Cookie": f"refresh_token={refresh_token}; Path=/"})
+
+    def get_token(self, query):
+        user = self.server.state.codes.pop(self._json_body().get("code"), None)
+        if user is None:
+            return self._send(400, b'{"message": "Invalid code"}')
+        self._send_tokens(user, wrap=False)
+
+    def try_refresh_token(self, query):
+        user = self.server.state.refresh_tokens.get(self._cookie("refresh_token"))
+        if user is None:
+            return self._send(401, b'{"message": "Invalid refresh token"}')
+        self._send_tokens(user, wrap=True)
+
+    # API
+
+    def head_api(self, query):
+        self._send(200)
+
+    @_authorized
+    def get_zones(self, user, payload):
+        self._send_json({"parkingSpotZones": self.server.state.zones})
+
+    @_authorized
+    def get_spots(self, user, payload):
+        self._send_json(self.server.state.get_spots(user, payload.get("parkingSpotZoneId")))
+
+    @_authorized
+    def get_map(self, user, payload):
+        body = json.dumps(self.server.state.get_map(payload.get("parkingSpotZoneId"), payload.get("date"))).encode()
+        if not self.server.etag:
+            return self._send(200, body)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        self._send(200, body, headers={"ETag": etag})
+
+    @_authorized
+    def take_spot(self, user, payload):
+        state = self.server.state
+        self._send_json(state.take(user, payload.get("parkingSpotZoneId"), payload.get("parkingSpotIdOrNull"),
+                                   payload.get("dayToTake")))
+
+    @_authorized
+    def resign(self, user, payload):
+        self.server.state.release(user, payload.get("daysToShare", []))
+        # the real service answers with an empty body
+        self._send(200, content_type="text/plain")
+
+    @_authorized
+    def get_reservations(self, user, payload):
+        self._send_json({"reservations": self.server.state.reservations_of(user)})
+
+    @_authorized
+    def get_employees(self, user, payload):
+        self._send_json({"employeesOrNull": []})
+
+    @_authorized
+    def get_context(self, user, payload):
+        self._send_json({"employeeEmail": user})
+
+    routes = {
+        ("GET", "/api/auth0/authorize"): authorize,
+        ("GET", "/callback"): callback,
+        ("POST", "/api/auth0/get-token"): get_token,
+        ("POST", "/api/auth0/try-refresh-token"): try_refresh_token,
+        ("HEAD", "/api"): head_api,
+        ("POST", "/api/get-employee-context"): get_context,
+        ("POST", "/api/marketplace/get-parking-spot-zones"): get_zones,
+        ("POST", "/api/marketplace/get-spots"): get_spots,
+        ("POST", "/api/marketplace/get-marketplace-parking-spot-zone-map"): get_map,
+        ("POST", "/api/employee-reservations/take-spot-from-marketplace"): take_spot,
+        ("POST", "/api/employee-reservations/resign"): resign,
+        ("GET", "/api/employee-reservations/get-employee-reservations"): get_reservations,
+        ("POST", "/api/employee-reservations/get-employees"): get_employees,
+    }
+    login_routes = {
+        ("POST", "SelfAsserted"): self_asserted,
+        ("GET", "api/CombinedSigninAndSignup/confirmed"): confirmed,
+    }
+
+
+class FakeParkanizerServer(ThreadingHTTPServer):
+    """
+    HTTP server of the fake service, with simulated latency and injected failures.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], state: FakeParkanizerState = None, latency: float = 0.0,
+                 jitter: float = 0.0, take_latency: float = None, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 churn: float = 0.0, etag: bool = False, verbose: bool = False):
+        """
+        :param address: (host, port) to listen on (port 0 picks a free one).
+        :param state: The service's state (default one is created if not given).
+        :param latency: Time (in seconds) every request takes.
+        :param jitter: Random time (in seconds, up to) added to the latency.
+        :param take_latency: Latency of `take-spot-from-marketplace` (the same as the others if not given).
+        :param error_rate: Fraction of requests answered with 503 error.
+        :param drop_rate: Fraction of requests dropped without a response (connection closed).
+        :param churn: How many times per second other bookers take or release a spot.
+        :param etag: Send ETag with the spot maps (and answer 304 Not Modified to If-None-Match).
+        :param verbose: Log every request.
+        """
+        super().__init__(address, FakeParkanizerHandler)
+        self.state = state if state is not None else FakeParkanizerState()
+        self.latency = latency
+        self.jitter = jitter
+        self.take_latency = take_latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.churn = churn
+        self.etag = etag
+        self.verbose = verbose
+        self._random = random.Random()
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def simulate_latency(self, path: str):
+        latency = self.take_latency if self.take_latency is not None and path.endswith("/take-spot-from-marketplace") \
+            else self.latency
+        delay = latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def injected_failure(self) -> str | None:
+        roll = self._random.random()
+        if roll < self.drop_rate:
+            return "drop"
+        if roll < self.drop_rate + self.error_rate:
+            return "error"
+        return None
+
+    def _run_churn(self):
+        while not self._stopped.wait(1 / self.churn):
+            self.state.churn()
+
+    def start(self) -> threading.Thread:
+        """
+        Serve in a background thread (for use in benchmarks and tests). Stop with `shutdown()`.
+        """
+        thread = threading.Thread(target=self.serve_forever, name="fake-parkanizer", daemon=True)
+        thread.start()
+        if self.churn > 0:
+            threading.Thread(target=self._run_churn, name="fake-parkanizer-churn", daemon=True).start()
+        return thread
+
+    def shutdown(self):
+        self._stopped.set()
+        super().shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--zones", type=int, default=2, help="Number of zones (default: 2).")
+    parser.add_argument("--spots", type=int, default=20, help="Number of spots per zone (default: 20).")
+    parser.add_argument("--days", type=int, default=14, help="Number of days that can be booked (default: 14).")
+    parser.add_argument("--occupancy", type=float, default=0.5,
+                        help="Fraction of spots initially taken by others (default: 0.5).")
+    parser.add_argument("--contention", type=float, default=0.0,
+                        help="Probability that someone takes the requested spot first (default: 0).")
+    parser.add_argument("--churn", type=float, default=0.0,
+                        help="Spots taken or released by others per second (default: 0).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of every request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency added (up to, in seconds).")
+    parser.add_argument("--take-latency", type=float, help="Latency of the spot reservation requests.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 503.")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of requests dropped.")
+    parser.add_argument("--token-ttl", type=float, default=3600, help="Lifetime of access tokens in seconds.")
+    parser.add_argument("--etag", action="store_true", help="Send ETags with the spot maps.")
+    parser.add_argument("--seed", type=int, help="Seed for repeatable runs.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    state = FakeParkanizerState(zones=args.zones, spots=args.spots, days=args.days, occupancy=args.occupancy,
+                                contention=args.contention, token_ttl=args.token_ttl, seed=args.seed)
+    server = FakeParkanizerServer(
+        (args.host, args.port), state, latency=args.latency, jitter=args.jitter, take_latency=args.take_latency,
+        error_rate=args.error_rate, drop_rate=args.drop_rate, churn=args.churn, etag=args.etag, verbose=args.verbose,
+    )
+    print(f"Fake Parkanizer service at {server.url} (PARKANIZER_API={server.url}/api "
+          f"PARKANIZER_LOGIN_URL={server.url}/login)", flush=True)
+    thread = server.start()
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Timing of the HTTP calls sent to the service: counters and latency histograms per endpoint, retries and a trace
+of the recent calls. The data can be exported as Prometheus text format or JSON summary (see `HttpMetrics.write`).
+"""
+import json
+import os
+import pathlib
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+from .config import PARKANIZER_API
+
+# upper bounds (in seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# max number of calls kept in the trace (the oldest are dropped in long-running processes)
+TRACE_LIMIT = 10000
+
+_API_PATH = urlparse(PARKANIZER_API).path
+
+
+def endpoint_of(url: str) -> str:
+    """
+    Return the path of the URL without the API prefix (for example `/marketplace/get-spots`).
+    """
+    path = urlparse(url).path
+    return path.removeprefix(_API_PATH) or "/"
+
+
+def _quantile(counts: list[int], q: float) -> float:
+    """
+    Estimate the quantile from the histogram (interpolating within the bucket, like Prometheus does).
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = BUCKETS[i - 1] if i else 0.0
+            upper = BUCKETS[i] if BUCKETS[i] != float("inf") else lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return BUCKETS[-2]
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+class _Call:
+    def __init__(self):
+        self.status = None
+
+
+class HttpMetrics:
+    """
+    Thread-safe store of the HTTP calls' measurements.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            # (method, endpoint) -> counts of the statuses, latency histogram and total time
+            self.statuses: dict[tuple[str, str], Counter] = {}
+            self.histograms: dict[tuple[str, str], list[int]] = {}
+            self.durations: dict[tuple[str, str], float] = {}
+            self.max_durations: dict[tuple[str, str], float] = {}
+            # (endpoint, reason) -> number of retries
+            self.retries: Counter = Counter()
+            self.trace: deque = deque(maxlen=TRACE_LIMIT)
+
+    def observe(self, method: str, url: str, status, duration: float, started: float = None):
+        """
+        Record a call.
+        :param status: Response's status code or the name of the error, if there was no response.
+        :param duration: Time (in seconds) the call took.
+        :param started: When (`time.perf_counter()`) the call was sent (default: `duration` ago).
+        """
+        key = (method, endpoint_of(url))
+        started = started if started is not None else time.perf_counter() - duration
+        bucket = next(i for i, bound in enumerate(BUCKETS) if duration <= bound)
+        with self._lock:
+            if key not in self.statuses:
+                self.statuses[key] = Counter()
+                self.histograms[key] = [0] * len(BUCKETS)
+                self.durations[key] = 0.0
+                self.max_durations[key] = 0.0
+            self.statuses[key][str(status)] += 1
+            self.histograms[key][bucket] += 1
+            self.durations[key] += duration
+            self.max_durations[key] = max(self.max_durations[key], duration)
+            self.trace.append({
+                "start_s": round(started - self._start, 6),
+                "duration_ms": round(duration * 1000, 3),
+                "method": method,
+                "endpoint": key[1],
+                "status": status,
+                "thread": threading.current_thread().name,
+            })
+
+    @contextmanager
+    def timed(self, method: str, url: str):
+        """
+        Time the call in the `with` block. Set `status` of the yielded object to the response's status code
+        (if the block raises, the error is recorded instead).
+        """
+        call = _Call()
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            call.status = type(e).__name__
+            raise
+        finally:
+            self.observe(method, url, call.status, time.perf_counter() - started, started)
+
+    def count_retry(self, url: str, reason: str, count: int = 1):
+        with self._lock:
+            self.retries[(endpoint_of(url), reason)] += count
+
+    def summary(self) -> dict:
+        """
+        Return the measurements as a JSON-serializable dict (with the trace of the recent calls).
+        """
+        with self._lock:
+            endpoints = {}
+            for key, statuses in self.statuses.items():
+                count = sum(statuses.values())
+                histogram = self.histograms[key]
+                slowest = self.max_durations[key]
+                endpoints[" ".join(key)] = {
+                    "count": count,
+                    "statuses": dict(statuses),
+                    "total_s": round(self.durations[key], 6),
+                    "mean_ms": round(self.durations[key] / count * 1000, 3),
+                    # estimated from the histogram (not above the slowest call, though)
+                    "p50_ms": round(min(_quantile(histogram, 0.5), slowest) * 1000, 3),
+                    "p99_ms": round(min(_quantile(histogram, 0.99), slowest) * 1000, 3),
+                    "max_ms": round(slowest * 1000, 3),
+                }
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "duration_s": round(time.perf_counter() - self._start, 6),
+                "requests": sum(e["count"] for e in endpoints.values()),
+                "http_time_s": round(sum(self.durations.values()), 6),
+                "endpoints": dict(sorted(endpoints.items(), key=lambda e: e[1]["total_s"], reverse=True)),
+                "retries": {f"{endpoint} ({reason})": count for (endpoint, reason), count in self.retries.items()},
+                "trace": list(self.trace),
+            }
+
+    def prometheus(self) -> str:
+        """
+        Return the measurements in Prometheus text format.
+        """
+        lines = [
+            "# HELP tidarator_http_requests_total HTTP requests sent to the service.",
+            "# TYPE tidarator_http_requests_total counter",
+        ]
+        with self._lock:
+            for (method, endpoint), statuses in sorted(self.statuses.items()):
+                for status, count in sorted(statuses.items()):
+                    lines.append(f"tidarator_http_requests_total{{{_labels(method=method, endpoint=endpoint, status=status)}}} {count}")
+
+            lines += [
+                "# HELP tidarator_http_request_duration_seconds Time the HTTP requests took.",
+                "# TYPE tidarator_http_request_duration_seconds histogram",
+            ]
+            for (method, endpoint), histogram in sorted(self.histograms.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'tidarator_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"tidarator_http_request_duration_seconds_sum{{{labels}}} {self.durations[(method, endpoint)]}")
+                lines.append(f"tidarator_http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+            lines += [
+                "# HELP tidarator_http_retries_total Requests sent again (after a failure or a rejected token).",
+                "# TYPE tidarator_http_retries_total counter",
+            ]
+            for (endpoint, reason), count in sorted(self.retries.items()):
+                lines.append(f"tidarator_http_retries_total{{{_labels(endpoint=endpoint, reason=reason)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: pathlib.Path):
+        """
+        Write the measurements to the file: in Prometheus text format if its name ends with `.prom`,
+        JSON summary otherwise. The file is replaced at once, so its readers never see a partial content.
+        """
+        path = pathlib.Path(path)
+        content = self.prometheus() if path.suffix == ".prom" else json.dumps(self.summary(), indent=2) + "\n"
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(content)
+        os.replace(temporary, path)
+
+
+# measurements of the whole process (shared by the sessions, unless they are given their own)
+registry = HttpMetrics()
@@ -0,0 +1,91 @@
+import atexit
+import queue
+import threading
+import time
+
+from tidarator.log_config import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class NotificationDispatcher(object):
+    """
+    Delivers notifications in a background thread, so slow notifiers (SMTP, etc.) don't delay the actions.
+
+    The dispatcher is registered as a listener instead of the notifier (`action.register_listener(d.send_notification)`).
+    Events arriving within `batch_window` seconds from each other are coalesced:
+    they are sent as one digest if the notifier implements `send_digest(events)`.
+    Pending notifications are flushed when the application exits.
+    """
+
+    def __init__(self, notifier, batch_window: float = 1.0, flush_timeout: float = 30.0):
+        """
+        :param notifier: Object with `send_notification(event_type, data)` method
+                         (and optionally `send_digest(events)`, where events is a list of (event_type, data) tuples).
+        :param batch_window: How long (in seconds) to wait for more events before sending.
+        :param flush_timeout: How long (in seconds) to wait for pending notifications on exit.
+        """
+        self.notifier = notifier
+        self.batch_window = batch_window
+        self.flush_timeout = flush_timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def send_notification(self, event_type, data):
+        """
+        Queue the event (returns immediately).
+        """
+        self._queue.put((event_type, data))
+
+    def _collect_batch(self, first) -> tuple[list, bool]:
+        batch = [first]
+        # a steady stream of events must not postpone the delivery forever
+        deadline = time.monotonic() + 10 * self.batch_window
+        while True:
+            timeout = min(self.batch_window, deadline - time.monotonic())
+            try:
+                if timeout <= 0:
+                    raise queue.Empty
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return batch, False
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+
+    def _deliver(self, batch: list):
+        try:
+            if len(batch) > 1 and hasattr(self.notifier, "send_digest"):
+                self.notifier.send_digest(batch)
+            else:
+                for event_type, data in batch:
+                    self.notifier.send_notification(event_type, data)
+        except Exception as e:
+            logger.error(f"Couldn't deliver {len(batch)} notification(s): {e}")
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopped = self._collect_batch(first)
+            self._deliver(batch)
+
+    def close(self):
+        """
+        Send pending notifications and stop the background thread.
+        """
+        if not self._thread.is_alive():
+            return
+        started = time.monotonic()
+        self._queue.put(_STOP)
+        self._thread.join(self.flush_timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Pending notifications not sent within {self.flush_timeout}s")
+        else:
+            logger.debug(f"Notifications flushed in {time.monotonic() - started:.2f}s")
@@ -1,5 +1,3 @@
-import yagmail
-
 from tidarator.log_config import get_logger
 from tidarator.notifiers.utils import format_results
 
@@ -18,25 +16,53 @@ class GmailNotifier(object):
         self.recipient = recipient
         if isinstance(self.recipient, str):
             self.recipient = [self.recipient]
-        self.yag = yagmail.SMTP(sender, password)
+        self._yag = None
         logger.info('gmail notifier initialized')
 
+    @property
+    def yag(self):
+        """
+        SMTP client, created (and connected) only when the first notification is sent.
+        """
+        if self._yag is None:
+            import yagmail
+
+            self._yag = yagmail.SMTP(self.sender, self.password)
+        return self._yag
+
     def _construct_message_body(self, event_type, data):
         body = ''
         if event_type == 'error':
-            body += f'Parkanizer Bot notification: Error! {data["result"]["error"]}'
+            # errors come either as the action's result or as bare {'error': ...}
+            error = data['result']['error'] if 'result' in data else data.get('error')
+            body += f'Parkanizer Bot notification: Error! {error}'
+        elif isinstance(data, list):
+            # failures of `BookSpot` come as the list of the failure messages (empty if no preferred spot was free)
+            messages = '\n'.join(str(message) for message in data) or 'None of the preferred spots was free.'
+            body += f'Parkanizer Bot notification: Failure!\n{messages}'
         else:
             body += format_results(data)
         return body
 
+    def _send(self, subject, body):
+        body += '\n\n https://share.parkanizer.com/reservations-list'
+        # a separate message for every recipient (so they don't see each other's addresses),
+        # all of them sent over the same SMTP connection
+        for recipient in self.recipient:
+            result = self.yag.send(to=recipient, subject=subject, contents=body)
+            logger.debug(f'gmail notification sending to {recipient} status:{str(result)}')
+
     def send_notification(self, event_type, data):
         logger.info('sending notification to gmail')
         subject = f'Parkanizer Bot notification'
-        body = self._construct_message_body(event_type, data)
-        body += '\n\n https://share.parkanizer.com/reservations-list'
-
-        # if recipient is a string, make it a list
-        for r in self.recipient:
-            result = self.yag.send(to=r, subject=subject, contents=body)
-            logger.debug(f'gmail notification sending to {r} status:{str(result)}')
+        self._send(subject, self._construct_message_body(event_type, data))
 
+    def send_digest(self, events):
+        """
+        Send many events as one message.
+        :param events: list of (event_type, data) tuples
+        """
+        logger.info(f'sending digest of {len(events)} notifications to gmail')
+        subject = f'Parkanizer Bot notification ({len(events)} events)'
+        body = '\n\n---\n\n'.join(self._construct_message_body(event_type, data) for event_type, data in events)
+        self._send(subject, body)
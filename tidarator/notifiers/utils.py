@@ -12,11 +12,25 @@ def format_results(data):
                 case _:
                     body += f"Couldn't book {data['request']['spot_name']} for {data['request']['for_date']}!"
 
+        case 'snipe_spot':
+            r = data['result']
+            match r['status']:
+                case 'success':
+                    # the spot may be unknown, if the service didn't return the reservation
+                    body += f"Spot {r.get('spot', '?')} in {r.get('zone', data['request']['zone_name'])} was booked for {data['request']['for_date']}.\n"
+                case _:
+                    body += f"Couldn't book {data['request']['spot_name']} for {data['request']['for_date']}!\n"
+            body += f"Attempts (latency from {data['request']['fire_at']}):\n"
+            for a in r['attempts']:
+                body += f"{str(a['spot_id']).ljust(8)} | {a['status'].rjust(12)} | {a['latency_ms']:>8} ms |\n"
+
         case 'release_spot':
             req = data['request']
             body += f"Spot for {req['for_date']} was released."
 
         case 'show_bookings':
+            if data['result']['status'] != 'success':
+                return f"Couldn't get the bookings: {data['result']['error']}"
             body += "Retrieved the following bookings:\n\n"
             for reservation in data['result']['bookings']:
                 parking_spot = reservation['my_booking']['name'] if reservation['my_booking'] else ""
@@ -24,6 +38,8 @@ def format_results(data):
 
         case 'show_spots':
             r = data['result']
+            if r['status'] != 'success':
+                return f"Couldn't get spots in {r['zone']} for {r['for_date']}: {r['error']}"
             body += f"Retrieved the following spots in {r['zone']} for {r['for_date']}:\n\n"
             for s in r['spots']:
                 state = 'free' if s['free'] else ""
@@ -32,15 +48,25 @@ def format_results(data):
         case 'book_free':
             body += f"I was looking for free spots from {data['request']['look_from']} and tried to book spots {data['request']['spot_name']}.\n\n"
             attempts = data['result']
-            if attempts:
+            if isinstance(attempts, dict):
+                body += f"Couldn't get the bookings: {attempts['error']}"
+            elif attempts:
                 body += "Bookings:\n"
                 for a in attempts:
                     r = a['result']
                     booked = r['spot'] if r['status'] == 'success' else "FAILED"
-                    body += f"{r['for_date'].ljust(8)} | {booked.rjust(8)} |\n"
+                    body += f"{a['request']['for_date'].ljust(8)} | {booked.rjust(8)} |\n"
             else:
                 body += "No free spots found."
             body += "\n\n"
+        case 'accounts':
+            for a in data['result']:
+                body += f"=== {a['account']} ===\n"
+                if a['status'] == 'success':
+                    body += format_results(a['result']) + "\n"
+                else:
+                    body += f"Failed: {a['error']}\n"
+
         case _:
             body += f"Parkanizer Bot notification: Unknown action type: {data['action']}"
 
@@ -0,0 +1,174 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .log_config import get_logger
+from .spots.allocator import allocate
+
+logger = get_logger(__name__)
+
+
+class AccountOrchestrator:
+    """
+    Runs actions for many accounts from one process.
+
+    Every account has its own logged-in session, used for all its requests that depend on the account (spots' state,
+    bookings), while zones and spot IDs are the same for a tenant, so they are fetched once and shared by its accounts. The sessions are created once and reused by the following runs.
+    """
+
+    def __init__(self, accounts: list[dict], create_session, create_caches, concurrency: int = 4):
+        """
+        :param accounts: Accounts' configuration (see `tidarator.config.load_accounts`).
+        :param create_session: Callable that takes account's config and returns a logged-in session.
+        :param create_caches: Callable that takes the session, account's config and the registry to share zones
+                              and spot IDs with (None for the first account of a tenant) and returns `CacheRegistry`.
+        :param concurrency: How many accounts are served at once.
+        """
+        self.accounts = accounts
+        self.create_session = create_session
+        self.create_caches = create_caches
+        self.concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._caches = {}
+        self._metadata = {}
+        self._errors = {}
+        self._allocation_lock = threading.Lock()
+        self._allocations = {}
+
+    @staticmethod
+    def _name(config: dict) -> str:
+        return config["account"]["name"]
+
+    def _login(self, config: dict):
+        try:
+            return self.create_session(config)
+        except Exception as e:
+            logger.error(f"Couldn't log in {self._name(config)}: {e}")
+            return e
+
+    def _warm_up_metadata(self):
+        # resolve the zones and spot IDs once per tenant, so the accounts don't race to fetch the same data
+        resolved = set()
+        for config in self.accounts:
+            caches = self._caches.get(self._name(config))
+            key = (config["account"]["tenant"], config["book-spot"]["zone"])
+            if caches is None or key in resolved:
+                continue
+            resolved.add(key)
+            try:
+                zone = caches.zone_manager.get_by_name(config["book-spot"]["zone"])
+                if zone:
+                    caches.spot_manager.get_spots(zone["id"])
+            except Exception as e:
+                logger.warning(f"Couldn't fetch zone {key[1]} of tenant {key[0]}: {e}")
+
+    def prepare(self):
+        """
+        Log in the accounts that have no session yet (at once) and set up their caches.
+        Accounts that fail to log in are tried again by the next call.
+        """
+        with self._lock:
+            pending = [config for config in self.accounts if self._name(config) not in self._sessions]
+            if not pending:
+                return
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending)),
+                                    thread_name_prefix="login") as executor:
+                sessions = list(executor.map(self._login, pending))
+
+            for config, session in zip(pending, sessions):
+                name = self._name(config)
+                if isinstance(session, Exception) or session is None:
+                    self._errors[name] = str(session) if session is not None else "login failed"
+                    continue
+                self._errors.pop(name, None)
+                tenant = config["account"]["tenant"]
+                caches = self.create_caches(session, config, self._metadata.get(tenant))
+                self._metadata.setdefault(tenant, caches)
+                self._sessions[name] = session
+                self._caches[name] = caches
+            self._warm_up_metadata()
+
+    def _has_booking(self, config: dict, zone_id: str, day: str) -> bool:
+        try:
+            booking = self._caches[self._name(config)].bookings_manager.get_by_date(zone_id, day)
+        except Exception as e:
+            logger.warning(f"Couldn't check the bookings of {self._name(config)} for {day}: {e}")
+            return False
+        return bool(booking and booking['my_booking'])
+
+    def allocate(self, for_date: datetime, accounts: list[str] = None,
+                 skip_booked: bool = False) -> dict[str, str | None]:
+        """
+        Assign the free spots to the accounts up front, so they don't compete for the same spots.
+        The accounts of the same tenant booking in the same zone are allocated together.
+        :param for_date: The day to allocate the spots for.
+        :param accounts: Names of the accounts to allocate the spots to (default: all of them).
+        :param skip_booked: Leave out the accounts that already have a reservation for the day
+                            (it costs a bookings request per account, unless its bookings are cached).
+        :return: The spot name assigned to every (logged-in) account, None if there is no acceptable spot for it.
+        """
+        self.prepare()
+        groups = {}
+        for config in self.accounts:
+            name = self._name(config)
+            if name in self._caches and (accounts is None or name in accounts):
+                key = (config["account"]["tenant"], config["book-spot"]["zone"])
+                groups.setdefault(key, []).append(config)
+
+        day = for_date.strftime("%Y-%m-%d")
+        allocation = {}
+        for (tenant, zone_name), configs in groups.items():
+            # the state is fetched on behalf of an account of the group (with its session)
+            caches = self._caches[self._name(configs[0])]
+            zone = caches.zone_manager.get_by_name(zone_name)
+            free_spots = []
+            if zone:
+                free_spots = [s['name'] for s in caches.spot_manager.get_spots_state(zone['id'], for_date) if s['free']]
+                if skip_booked:
+                    configs = [config for config in configs if not self._has_booking(config, zone['id'], day)]
+            preferences = {self._name(config): config["book-spot"]["spots"] for config in configs}
+            group_allocation = allocate(preferences, free_spots)
+            logger.info(f"Allocation in {zone_name} ({tenant}) for {day}: {group_allocation}")
+            allocation.update(group_allocation)
+        return allocation
+
+    def allocated_spots(self, name: str, for_date: datetime, accounts: list[str] = None) -> list[str]:
+        """
+        Return the spot allocated to the account for the day, as its preferences (empty if it got none),
+        for the actions booking many days.
+        The day's free spots are allocated once, when the day is asked for the first time, among the given accounts
+        (the ones booking the day) that have no reservation for the day yet.
+        """
+        day = for_date.strftime("%Y-%m-%d")
+        with self._allocation_lock:
+            if day not in self._allocations:
+                self._allocations[day] = self.allocate(for_date, accounts, skip_booked=True)
+        spot = self._allocations[day].get(name)
+        return [spot] if spot else []
+
+    def _run_account(self, run_action, config: dict) -> dict:
+        name = self._name(config)
+        if name not in self._sessions:
+            return {'account': name, 'status': 'error', 'error': self._errors.get(name, "not logged in")}
+        try:
+            result = run_action(config, self._sessions[name], self._caches[name])
+            return {'account': name, 'status': 'success', 'result': result}
+        except Exception as e:
+            logger.exception(f"Action for {name} failed: {e}")
+            return {'account': name, 'status': 'error', 'error': str(e)}
+
+    def run(self, run_action, command: str = None) -> dict:
+        """
+        Run `run_action(config, session, caches)` for every account. Failures of one account don't stop the others.
+        :return: Results of the accounts (in the order of the accounts).
+        """
+        self.prepare()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(self.accounts)),
+                                thread_name_prefix="account") as executor:
+            results = list(executor.map(lambda config: self._run_account(run_action, config), self.accounts))
+        return {
+            'action': 'accounts',
+            'request': {'command': command, 'accounts': [self._name(config) for config in self.accounts]},
+            'result': results
+        }
@@ -0,0 +1,115 @@
+"""
+Allocation of free spots among accounts with (possibly overlapping) preferences.
+
+Instead of letting the accounts race for the same spots, the spots are assigned up front (as a minimum-cost
+matching of accounts and spots), so every account sends a single request for a spot nobody else asks for.
+"""
+
+
+def solve_assignment(cost: list[list[float]]) -> list[int]:
+    """
+    Assign every row a distinct column, so the total cost is minimal (Hungarian algorithm, O(rows^2 * columns)).
+    :param cost: Cost matrix with no more rows than columns.
+    :return: The column assigned to every row.
+    """
+    rows = len(cost)
+    columns = len(cost[0]) if rows else 0
+    if rows > columns:
+        raise ValueError("The cost matrix must not have more rows than columns")
+
+    # potentials of the rows and columns, the row matched with each column and the augmenting path
+    # (1-based, column 0 is a virtual one holding the row being added)
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    match = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        match[0] = row
+        j0 = 0
+        min_reduced = [float("inf")] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            delta = float("inf")
+            j1 = 0
+            for j in range(1, columns + 1):
+                if used[j]:
+                    continue
+                reduced = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                if reduced < min_reduced[j]:
+                    min_reduced[j] = reduced
+                    way[j] = j0
+                if min_reduced[j] < delta:
+                    delta = min_reduced[j]
+                    j1 = j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    assignment = [0] * rows
+    for j in range(1, columns + 1):
+        if match[j]:
+            assignment[match[j] - 1] = j - 1
+    return assignment
+
+
+def preference_ranks(preferences: list[str], free_spots: list[str]) -> dict[str, int]:
+    """
+    Return the rank (0 is the best) of every free spot the preferences accept ('*' accepts any).
+    """
+    free = set(free_spots)
+    ranks = {}
+    for rank, name in enumerate(preferences):
+        if name == '*':
+            for spot in free_spots:
+                ranks.setdefault(spot, rank)
+            break
+        if name in free:
+            ranks.setdefault(name, rank)
+    return ranks
+
+
+def allocate(preferences: dict[str, list[str]], free_spots: list[str]) -> dict[str, str | None]:
+    """
+    Assign the free spots to the accounts according to their preferences.
+
+    As many accounts as possible get a spot. Among such assignments, the one with the lowest sum of squared ranks
+    is chosen, which favours giving everybody their second choice over giving one the first and another the third.
+    :param preferences: Preferred spot names of every account (in the order of preference, '*' means any spot).
+    :param free_spots: Names of the spots that are free.
+    :return: The spot assigned to every account (None if there is no acceptable spot left for it).
+    """
+    accounts = list(preferences)
+    if not accounts:
+        return {}
+    ranks = [preference_ranks(preferences[account], free_spots) for account in accounts]
+    spots = [spot for spot in free_spots if any(spot in r for r in ranks)]
+
+    worst = max(len(p) for p in preferences.values()) ** 2
+    # leaving an account without a spot costs more than any assignment of the others,
+    # and a spot the account doesn't accept costs even more
+    unassigned = worst * len(accounts) + 1
+    unacceptable = 2 * unassigned
+
+    # a "no spot" column for every account makes a solution always exist
+    cost = [
+        [(r[spot] + 1) ** 2 if spot in r else unacceptable for spot in spots] + [unassigned] * len(accounts)
+        for r in ranks
+    ]
+    assignment = solve_assignment(cost)
+    return {
+        account: spots[column] if column < len(spots) and spots[column] in r else None
+        for account, column, r in zip(accounts, assignment, ranks)
+    }
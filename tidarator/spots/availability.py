@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..api.utils import str_to_date
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AvailabilityMatrix:
+    """
+    Free spots of a zone for many days at once (days x spots).
+
+    Every spot has a bit number; a day is kept as an int, which bits are the spots free that day.
+    That makes bulk questions ("which of my preferred spots are free on which days") cheap bitwise operations.
+    """
+
+    def __init__(self, zone_id: str, states: dict[str, list[dict]]):
+        """
+        :param zone_id: The zone the matrix is for.
+        :param states: Spots' state (as returned by `SpotCacheManager.get_spots_state`) for every day (YYYY-mm-dd).
+        """
+        self.zone_id = zone_id
+        self.spots: list[dict] = []
+        self.__bits: dict[str, int] = {}
+        self.__rows: dict[str, int] = {}
+        for day, spots in states.items():
+            row = 0
+            for spot in spots:
+                bit = self.__bits.get(spot['name'])
+                if bit is None:
+                    bit = self.__bits[spot['name']] = len(self.spots)
+                    self.spots.append({'id': spot['id'], 'name': spot['name']})
+                if spot['free']:
+                    row |= 1 << bit
+            self.__rows[day] = row
+
+    @classmethod
+    def fetch(cls, spot_manager, zone_id: str, days: list[str], concurrency: int = 4) -> "AvailabilityMatrix":
+        """
+        Fetch the spots' state of the zone for all the days (`concurrency` days at once).
+        The days that couldn't be fetched are left out (see `covers`), so they can be fetched again when needed.
+        """
+        days = list(dict.fromkeys(days))
+
+        def _fetch(day):
+            try:
+                return spot_manager.get_spots_state(zone_id, str_to_date(day))
+            except Exception as e:
+                logger.warning(f"Couldn't fetch spots' state of {day}: {e}")
+                return None
+
+        workers = max(1, min(concurrency, len(days)))
+        logger.info(f'Fetching availability of {len(days)} days with {workers} workers')
+        if workers == 1:
+            states = [_fetch(day) for day in days]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='availability') as executor:
+                states = list(executor.map(_fetch, days))
+        return cls(zone_id, {day: state for day, state in zip(days, states) if state is not None})
+
+    def covers(self, zone_id: str, day: str) -> bool:
+        return zone_id == self.zone_id and day in self.__rows
+
+    def mask(self, names: list[str]) -> int:
+        """
+        Return the bits of the spots with given names ('*' means all the spots).
+        """
+        if '*' in names:
+            return (1 << len(self.spots)) - 1
+        mask = 0
+        for name in names:
+            bit = self.__bits.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def days_with_free(self, names: list[str] = None) -> list[str]:
+        """
+        Return the days any of the given spots (any spot, if names are not given) is free.
+        """
+        mask = self.mask(names) if names is not None else -1
+        return [day for day, row in self.__rows.items() if row & mask]
+
+    def spots_state(self, day: str) -> list[dict]:
+        """
+        Return the spots' state for the day, in the form of `SpotCacheManager.get_spots_state`.
+        """
+        row = self.__rows[day]
+        return [{'id': spot['id'], 'name': spot['name'], 'free': bool(row >> bit & 1)}
+                for bit, spot in enumerate(self.spots)]
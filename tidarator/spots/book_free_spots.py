@@ -1,8 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-from .spot_manager import SpotCacheManager
-from .zone_manager import ZoneCacheManager
+from .availability import AvailabilityMatrix
+from .cache_registry import CacheRegistry
 from ..actions.action_base import ParkanizerActionBase
+from ..api.retry import RetryPolicy
 from ..api import utils
 from ..log_config import get_logger
 
@@ -11,15 +13,29 @@ logger = get_logger(__name__)
 
 class BookFreeSpots(ParkanizerActionBase):
 
-    def __init__(self, session, payload: dict):
+    def __init__(self, session, payload: dict, concurrency: int = 1, caches: CacheRegistry = None,
+                 retry_policy: RetryPolicy = None, race: int = 1, fetch_concurrency: int = 4, spots_for_day=None):
         """
         Initialize the class with the session_spot object.
         :param session: Session object for accessing the Parkanizer service.
         :param payload: dict with keys: zone_name, spot_name, start_from
+        :param concurrency: How many days may be booked in parallel (1 means one day after another).
+        :param caches: Caches shared with the composed actions (a new registry is created if not given).
+        :param retry_policy: How `take_spot` requests are retried (and hedged). Default policy is used if not given.
+        :param race: How many top preferences are requested at once for each day (see `BookSpot`).
+        :param fetch_concurrency: How many days' spots state is fetched at once.
+        :param spots_for_day: Callable that takes a day (YYYY-mm-dd) and returns the spots to request that day
+                              instead of the payload's ones (e.g. the spot allocated to the account).
         """
         super().__init__(session, payload)
-        self.zone_manager = ZoneCacheManager(session)
-        self.spot_manager = SpotCacheManager(session)
+        self.caches = caches if caches is not None else CacheRegistry(session)
+        self.zone_manager = self.caches.zone_manager
+        self.spot_manager = self.caches.spot_manager
+        self.concurrency = max(1, concurrency)
+        self.retry_policy = retry_policy
+        self.race = race
+        self.fetch_concurrency = fetch_concurrency
+        self.spots_for_day = spots_for_day
         logger.info(f'Payload: {self.payload}')
 
     # TODO XXX looks like this is not used....
@@ -32,20 +48,57 @@ class BookFreeSpots(ParkanizerActionBase):
                 {'fromBookingTime': 'P0DT00H00M', 'toBookingTime': 'P1DT00H00M'}
         }
 
+    def _book_days(self, book_action, payloads: list[dict]) -> list[dict]:
+        """
+        Run `book_action` for every payload and return the results in the order of the payloads.
+        With concurrency > 1 the days are booked by a bounded pool of workers sharing the session.
+        """
+        workers = min(self.concurrency, len(payloads))
+        if workers <= 1:
+            return [book_action.do_for_payload(p) for p in payloads]
+
+        # resolve the zone and spot IDs once, so the workers don't race to fetch the same data
+        try:
+            zone = book_action.zone_manager.get_by_name(payloads[0]['zone_name'])
+            if zone:
+                book_action.spot_manager.get_spots(zone.get('id'))
+        except Exception as e:
+            logger.warning(f"Couldn't resolve the zone and spots ahead of booking: {e}")
+
+        logger.info(f'Booking {len(payloads)} days with {workers} workers')
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='book-free') as executor:
+            return list(executor.map(book_action.do_for_payload, payloads))
+
+    def _fetch_availability(self, zone_id: str, bookings: list[dict]) -> AvailabilityMatrix | None:
+        """
+        Fetch the spots' state of all the candidate days at once (instead of one day by one while booking).
+        """
+        if not zone_id or not bookings:
+            return None
+        return AvailabilityMatrix.fetch(
+            self.spot_manager, zone_id, [booking['day'] for booking in bookings], concurrency=self.fetch_concurrency
+        )
+
     def do(self):
         logger.info(f'Booking free spots for the payload: {self.payload}')
-
-        # get objects' IDs
-        zone = self.zone_manager.get_by_name(self.payload['zone_name'])
-        zone_id = zone.get('id') if zone else None
+        look_from = utils.str_to_date(self.payload['start_from'])
+        result: dict[str, dict | list] = {'action': 'book_free', 'request': {**self.payload, 'look_from': look_from}}
 
         from tidarator.spots.show_bookings import ShowBookings
-        action = ShowBookings(self.session, self.payload)
+        action = ShowBookings(self.session, self.payload, caches=self.caches)
         gb_result = action.do()
+        if gb_result['result']['status'] != 'success':
+            # without the bookings there's no telling which days to book
+            result['result'] = {'status': 'error', 'error': gb_result['result']['error']}
+            self.notify_listeners('error', result)
+            return result
         bookings = gb_result['result']['bookings']
 
+        # get objects' IDs (already cached by ShowBookings)
+        zone = self.zone_manager.get_by_name(self.payload['zone_name'])
+        zone_id = zone.get('id') if zone else None
+
         # filter out weekends, my current bookings and dates with no free spots
-        look_from = utils.str_to_date(self.payload['start_from'])
         bookings = [
             booking for booking in bookings
             if utils.str_to_date(booking['day']) >= look_from
@@ -59,15 +112,29 @@ class BookFreeSpots(ParkanizerActionBase):
             'spot_name': self.payload['spot_name']
         }
 
+        availability = self._fetch_availability(zone_id, bookings)
+        if availability is not None:
+            # skip the days none of the preferred spots is free on (the days that failed to fetch are tried anyway)
+            spot_names = payload['spot_name'] if type(payload['spot_name']) is list else [payload['spot_name']]
+            days = set(availability.days_with_free(spot_names))
+            skipped = [booking['day'] for booking in bookings
+                       if booking['day'] not in days and availability.covers(zone_id, booking['day'])]
+            if skipped:
+                logger.info(f'None of the preferred spots is free on {skipped}')
+            bookings = [booking for booking in bookings if booking['day'] not in skipped]
+
         from tidarator.spots.book_spot import BookSpot
-        book_action = BookSpot(self.session, payload)
+        book_action = BookSpot(
+            self.session, payload, caches=self.caches, retry_policy=self.retry_policy, race=self.race,
+            availability=availability
+        )
+        # per-day errors are passed on, so the listeners learn about them along with the summary
+        book_action.register_listener(self.notify_listeners, 'error')
 
-        result: dict[str, dict | list] = {'action': 'book_free', 'request': {**self.payload, 'look_from': look_from}}
-        attempts = []
-        for booking in bookings:
-            payload['for_date'] = booking['day']
-            attempts.append(book_action.do_for_payload(payload))
-        result['result'] = attempts
+        payloads = [{**payload, 'for_date': booking['day']} for booking in bookings]
+        if self.spots_for_day is not None:
+            payloads = [{**p, 'spot_name': self.spots_for_day(p['for_date'])} for p in payloads]
+        result['result'] = self._book_days(book_action, payloads)
 
         self.notify_listeners('success', result)
         return result
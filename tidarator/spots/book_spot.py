@@ -1,6 +1,9 @@
-from .spot_manager import SpotCacheManager
-from .zone_manager import ZoneCacheManager
+from concurrent.futures import ThreadPoolExecutor
+
+from .availability import AvailabilityMatrix
+from .cache_registry import CacheRegistry
 from ..actions.action_base import ParkanizerActionBase
+from ..api.retry import RetryPolicy
 from ..api.utils import str_to_date
 from ..log_config import get_logger
 
@@ -9,15 +12,24 @@ logger = get_logger(__name__)
 
 class BookSpot(ParkanizerActionBase):
 
-    def __init__(self, session, payload: dict[str, str | list[str]]):
+    def __init__(self, session, payload: dict[str, str | list[str]], caches: CacheRegistry = None,
+                 retry_policy: RetryPolicy = None, race: int = 1, availability: AvailabilityMatrix = None):
         """
         Initialize the class with the session_spot object.
         :param session: Session object for accessing the Parkanizer service.
         :param payload: dict with keys: for_date (YYYY-mm-dd), zone_name, spot_name
+        :param caches: Caches shared with other actions (a new registry is created if not given).
+        :param retry_policy: How `take_spot` requests are retried (and hedged). Default policy is used if not given.
+        :param race: How many top preferences are requested at once (1 means one after another).
+        :param availability: Spots' state already fetched for the days to book (fetched per day if not given).
         """
         super().__init__(session, payload)
-        self.zone_manager = ZoneCacheManager(session)
-        self.spot_manager = SpotCacheManager(session)
+        self.caches = caches if caches is not None else CacheRegistry(session)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.race = max(1, race)
+        self.availability = availability
+        self.zone_manager = self.caches.zone_manager
+        self.spot_manager = self.caches.spot_manager
         logger.info(f'Payload: {self.payload}')
 
     # TODO XXX looks like this is not used....
@@ -30,13 +42,14 @@ class BookSpot(ParkanizerActionBase):
                 {'fromBookingTime': 'P0DT00H00M', 'toBookingTime': 'P1DT00H00M'}
         }
 
-    def _expand_spot_selection(self, zone_id, preference_input, spots_state):
+    def _expand_spot_selection(self, preference_input, spots_state):
         """
         Translate spot names to IDs ('choose any' -> None).
         Take only free spots.
         """
 
-        available_items = list([spot['name'] for spot in spots_state if spot['free']])
+        # the IDs come with the fresh state (the cached spots may miss a recently added one)
+        available_items = {spot['name']: spot['id'] for spot in spots_state if spot['free']}
         result = []
 
         for preference in preference_input:
@@ -44,11 +57,155 @@ class BookSpot(ParkanizerActionBase):
                 result.append(None)
                 break
             elif preference in available_items:
-                spot = self.spot_manager.get_by_name(zone_id, preference)
-                result.append(spot.get("id"))
+                result.append(available_items[preference])
 
         return result if result else None
 
+    def _spots_state(self, zone_id: str, day: str) -> list[dict]:
+        if self.availability is not None and self.availability.covers(zone_id, day):
+            return self.availability.spots_state(day)
+        return self.spot_manager.get_spots_state(zone_id, str_to_date(day))
+
+    def _reservation_result(self, zone: dict, p: dict, response: dict) -> dict | None:
+        """
+        Interpret `take_spot` response (and update cached bookings accordingly).
+        Return the booking result if the spot was reserved, None otherwise.
+        """
+        bookings_manager = self.caches.bookings_manager
+        if response.get('status') != 'Reserved':
+            # the day has changed in a way we don't know
+            bookings_manager.invalidate(zone.get('id') if zone else None, p['for_date'])
+            return None
+
+        reservation = response['receivedParkingSpotOrNull']
+        if zone:
+            bookings_manager.record_booking(zone['id'], p['for_date'], {'parkingSpotZoneName': zone['name'], **(reservation or {})})
+        if reservation:
+            return {
+                'zone': zone['name'],
+                'spot': reservation['name'],
+                'for_date': p['for_date'],
+                'status': 'success'
+            }
+        # This should never happen
+        return {'status': 'success', 'note': 'Could not get the reservation status from API response...'}
+
+    def _take_spot(self, zone_id: str, spot_id: str, p: dict) -> dict:
+        """
+        Send `take_spot` according to the retry policy and return the response (or raise the last error).
+        """
+        outcome = self.retry_policy.call(self.session.take_spot, zone_id, spot_id, p['for_date'])
+        if outcome.attempts > 1:
+            self.session.metrics.count_retry(self.session.TAKE_SPOT_URL, "retry_policy", outcome.attempts - 1)
+        if outcome.response is None:
+            raise outcome.error
+
+        # after a failure that doesn't tell if the server processed the request, a repeated request
+        # may be rejected just because the spot has already been reserved by us - check the bookings then
+        if outcome.ambiguous and outcome.response.get('status') != 'Reserved':
+            bookings_manager = self.caches.bookings_manager
+            bookings_manager.invalidate(zone_id, p['for_date'])
+            booking = bookings_manager.get_by_date(zone_id, p['for_date'])
+            my_booking = booking['my_booking'] if booking else None
+            if my_booking and (spot_id is None or my_booking['id'] == spot_id):
+                logger.info(f"Spot {my_booking['name']} turned out to be reserved by an earlier attempt")
+                return {'status': 'Reserved', 'receivedParkingSpotOrNull': my_booking}
+        return outcome.response
+
+    def _split_race(self, spot_ids: list | None) -> tuple[list, list]:
+        """
+        Split the preferred spot IDs into the ones to race and the ones to try one by one afterward.
+        "Any spot" (None) never races: it could win a spot that isn't preferred while a preferred one is free,
+        so it's tried only after all the named spots are lost.
+        """
+        spot_ids = spot_ids or []
+        named = [spot_id for spot_id in spot_ids if spot_id is not None]
+        any_spot = [None] if None in spot_ids else []
+        if self.race <= 1 or len(named) <= 1:
+            return [], named + any_spot
+        return named[:self.race], named[self.race:] + any_spot
+
+    def _race(self, zone: dict, zone_id: str, spot_ids: list, p: dict, failures: list) -> dict | None:
+        """
+        Request all the given spots at once (within a single round trip) and keep the best one reserved.
+        Return the booking result, or None if none of the spots was reserved.
+        """
+        logger.info(f"Racing for spots {spot_ids} for {p['for_date']}")
+        with ThreadPoolExecutor(max_workers=len(spot_ids), thread_name_prefix="race") as executor:
+            futures = [executor.submit(self._take_spot, zone_id, spot_id, p) for spot_id in spot_ids]
+
+        # (spot ID, response) of the won requests, in the order of preference
+        reserved = []
+        for spot_id, future in zip(spot_ids, futures):
+            try:
+                response = future.result()
+            except Exception as e:
+                self.notify_listeners('error', {'error': str(e)})
+                continue
+            if response.get('status') == 'Reserved':
+                reserved.append((spot_id, response))
+            else:
+                # most likely taken by someone else or rejected, because another request of the race won
+                failures.append(f"Couldn't reserve spot {spot_id} for {p['for_date']}")
+
+        if not reserved:
+            self.caches.bookings_manager.invalidate(zone_id, p['for_date'])
+            return None
+        return self._reservation_result(zone, p, self._settle_race(zone_id, spot_ids, reserved, p))
+
+    def _held_reservation(self, zone_id: str, reserved: list[tuple], p: dict) -> tuple[str | None, dict]:
+        """
+        Return the ID of the spot the race ended up holding and the response describing it.
+        The service holds one reservation per day, so when more than one request reported a reservation,
+        the bookings tell which one is actually held.
+        """
+        if len(reserved) == 1:
+            return reserved[0]
+        bookings_manager = self.caches.bookings_manager
+        bookings_manager.invalidate(zone_id, p['for_date'])
+        booking = bookings_manager.get_by_date(zone_id, p['for_date'])
+        held = booking['my_booking'] if booking else None
+        if not held:
+            return reserved[0]
+        return held['id'], {'status': 'Reserved', 'receivedParkingSpotOrNull': held}
+
+    def _settle_race(self, zone_id: str, spot_ids: list, reserved: list[tuple], p: dict) -> dict:
+        """
+        Make sure the race keeps the best spot that can be had.
+        The service allows one reservation per day, so the first request to arrive wins and rejects the others,
+        even the ones for better spots. If a better raced spot is still free, release the held one and take
+        the better one (getting back the held one if that fails).
+        """
+        held_id, held_response = self._held_reservation(zone_id, reserved, p)
+        ahead = spot_ids[:spot_ids.index(held_id)] if held_id in spot_ids else spot_ids
+        if not ahead:
+            return held_response
+
+        try:
+            # the map is fetched fresh: the state from before the race doesn't tell what the race took
+            states = self.spot_manager.get_spots_state(zone_id, str_to_date(p['for_date']))
+        except Exception as e:
+            logger.warning(f"Couldn't check the spots better than the won one for {p['for_date']}: {e}")
+            return held_response
+        free = {spot['id'] for spot in states if spot['free']}
+        better = [spot_id for spot_id in ahead if spot_id in free]
+        if not better:
+            return held_response
+
+        logger.info(f"Spot {held_id} won the race while better spots {better} are free, swapping it")
+        bookings_manager = self.caches.bookings_manager
+        self.session.release_spot(p['for_date'])
+        bookings_manager.record_release(p['for_date'])
+        for spot_id in better + [held_id]:
+            try:
+                response = self._take_spot(zone_id, spot_id, p)
+            except Exception as e:
+                self.notify_listeners('error', {'error': str(e)})
+                continue
+            if response.get('status') == 'Reserved':
+                return response
+        return {'status': 'NotReserved'}
+
     def do_for_payload(self, p: dict[str, str | list[str]]) -> dict:
         logger.info(f'Booking a spot for the payload: {p}')
 
@@ -60,47 +217,47 @@ class BookSpot(ParkanizerActionBase):
         if type(spots) is str:
             spots = [spots]
 
-        spots_states = self.spot_manager.get_spots_state(zone_id, str_to_date(p['for_date']))
-        spot_ids = self._expand_spot_selection(zone_id, spots, spots_states)
+        result: dict[str, dict] = {'action': 'book_spot', 'request': p}
+        failures = []
+        try:
+            spots_states = self._spots_state(zone_id, p['for_date'])
+        except Exception as e:
+            self.notify_listeners('error', {'error': str(e)})
+            result['result'] = {
+                'status': 'failure',
+                'messages': [f"Couldn't get the spots' state for {p['for_date']}: {e}"]
+            }
+            return result
+        spot_ids = self._expand_spot_selection(spots, spots_states)
 
         logger.debug(f'Zone ID: {zone_id}; Spot IDs: {spot_ids}')
 
-        result: dict[str, dict] = {'action': 'book_spot', 'request': p}
-        success = False
-        failures = []
+        race_ids, spot_ids = self._split_race(spot_ids)
+        if race_ids:
+            reservation = self._race(zone, zone_id, race_ids, p, failures)
+            if reservation:
+                result['result'] = reservation
+                self.notify_listeners('success', result)
+                return result
+
         for spot_id in spot_ids:
             try:
-                response = self.session.take_spot(zone_id, spot_id, p['for_date'])
-                if 'status' in response:
-                    if response['status'] == 'Reserved':
-                        reservation = response['receivedParkingSpotOrNull']
-                        if reservation:
-                            result['result'] = {
-                                'zone': zone['name'],
-                                'spot': reservation['name'],
-                                'for_date': p['for_date'],
-                                'status': 'success'
-                            }
-                        else:
-                            # This should never happen
-                            result['result'] = {'status': 'success',
-                                                'note': 'Could not get the reservation status from API response...'}
-
-                        self.notify_listeners('success', result)
-                        success = True
-                        break
-                    else:
-                        failures.append(f"Couldn't reserve spot {spot_id} for {p['for_date']}")
+                response = self._take_spot(zone_id, spot_id, p)
+                reservation = self._reservation_result(zone, p, response)
+                if reservation:
+                    result['result'] = reservation
+                    self.notify_listeners('success', result)
+                    return result
+                failures.append(f"Couldn't reserve spot {spot_id} for {p['for_date']}")
 
             except Exception as e:
                 self.notify_listeners('error', {'error': str(e)})
-        if not success:
-            result['result'] = {
-                'status': 'failure',
-                'messages': failures
-            }
-            self.notify_listeners('failure', failures)
 
+        result['result'] = {
+            'status': 'failure',
+            'messages': failures
+        }
+        self.notify_listeners('failure', failures)
         return result
 
     def do(self):
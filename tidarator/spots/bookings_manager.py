@@ -1,7 +1,15 @@
+import threading
+import time
+
+from .utils import index_by
+from .. import tracing
+
+
 class BookingsCacheManager:
     """
     Responsible for getting and user's bookings for given zone.
-    Keeps a short-live cache of bookings.
+    Keeps a short-live cache of bookings: it expires after `ttl` seconds or when a day is invalidated,
+    and it is updated in place after the user's own bookings and releases.
     """
 
     # Extract unique reserved parking spots
@@ -26,18 +34,53 @@ class BookingsCacheManager:
         data = self.session_object.get_spots(zone_id)
         return sorted(self.__list_days(data), key=lambda x: x['day'])
 
-    def __init__(self, session_object):
+    def __init__(self, session_object, ttl: float = 60):
         """
         Initializes with a session object (that the class will use to fetch spots).
-        Optionally force_fetch can be set to True to force a fetch of spots on init.
+        :param ttl: Time (in seconds) after which the cached bookings are fetched again.
         """
         self.session_object = session_object
+        self.ttl = ttl
+        self.__lock = threading.Lock()
+        self.__fetch_lock = threading.Lock()
         self.__bookings = {}
+        self.__by_date = {}
+        self.__fetched_at = {}
+        self.__stale_days = {}
+
+    def __is_valid(self, zone_id: str, day: str = None) -> bool:
+        """
+        Check if cached bookings are still valid (only the given day is checked for staleness, if given).
+        """
+        if zone_id not in self.__bookings or time.monotonic() - self.__fetched_at[zone_id] > self.ttl:
+            return False
+        stale_days = self.__stale_days[zone_id]
+        return day not in stale_days if day else not stale_days
+
+    def __refresh(self, zone_id: str, day: str = None) -> tuple[list[dict], dict]:
+        """
+        Return the zone's bookings and their index by day, fetched again if the cached ones aren't valid.
+        """
+        # one fetch at a time: concurrent readers of an outdated zone wait for a single fetch instead of repeating it
+        with self.__fetch_lock:
+            with self.__lock:
+                # checked and read together, so a concurrent `invalidate` can't drop the zone in between
+                if self.__is_valid(zone_id, day):
+                    tracing.event("bookings", "cache", {"zone_id": zone_id, "day": day, "cache": "hit"})
+                    return self.__bookings[zone_id], self.__by_date[zone_id]
+            with tracing.span("fetch bookings", "cache", {"zone_id": zone_id, "day": day, "cache": "miss"}):
+                bookings = self.__fetch_spots(zone_id)
+                by_date = index_by(bookings, "day")
+                with self.__lock:
+                    self.__by_date[zone_id] = by_date
+                    self.__bookings[zone_id] = bookings
+                    self.__fetched_at[zone_id] = time.monotonic()
+                    self.__stale_days[zone_id] = set()
+                return bookings, by_date
 
     def get_bookings(self, zone_id: str):
-        if not zone_id in self.__bookings:
-            self.__bookings[zone_id] = self.__fetch_spots(zone_id)
-        return self.__bookings[zone_id]
+        bookings, _ = self.__refresh(zone_id)
+        return bookings
 
     def get_by_date(self, zone_id: str, day: str):
         """
@@ -46,4 +89,52 @@ class BookingsCacheManager:
         :param day: The day of the reservation
         :return: The spot object or None if not found.
         """
-        return next((spot for spot in self.get_bookings(zone_id) if spot.get("day") == day), None)
+        _, by_date = self.__refresh(zone_id, day)
+        return by_date.get(day)
+
+    def invalidate(self, zone_id: str = None, day: str = None):
+        """
+        Mark cached bookings as outdated, so they are fetched again on the next read.
+        :param zone_id: The zone to invalidate (all zones if not given).
+        :param day: The single day to invalidate (whole zone if not given).
+        """
+        with self.__lock:
+            zone_ids = [zone_id] if zone_id else list(self.__bookings)
+            for z in zone_ids:
+                if day and day in self.__by_date.get(z, {}):
+                    self.__stale_days[z].add(day)
+                elif not day:
+                    self.__bookings.pop(z, None)
+
+    def record_booking(self, zone_id: str, day: str, spot: dict):
+        """
+        Optimistically update cached day after a successful `take_spot`
+        (so following decisions in the same run don't need to fetch the bookings again).
+        :param spot: The reserved spot (`receivedParkingSpotOrNull` of `take_spot` response).
+        """
+        with self.__lock:
+            booking = self.__by_date.get(zone_id, {}).get(day)
+            if booking is None:
+                return
+            # the response of `take_spot` tells the state of the day, so it is not stale anymore
+            self.__stale_days[zone_id].discard(day)
+            if not booking['my_booking'] and booking['free_spots']:
+                booking['free_spots'] -= 1
+            booking['my_booking'] = {
+                "id": spot.get("id"),
+                "name": spot.get("name"),
+                "parkingSpotZoneId": spot.get("parkingSpotZoneId", zone_id),
+                "parkingSpotZoneName": spot.get("parkingSpotZoneName")
+            }
+
+    def record_release(self, day: str):
+        """
+        Optimistically update cached day (in any zone) after a successful `release_spot`.
+        """
+        with self.__lock:
+            for by_date in self.__by_date.values():
+                booking = by_date.get(day)
+                if booking and booking['my_booking']:
+                    booking['my_booking'] = {}
+                    if booking['free_spots'] is not None:
+                        booking['free_spots'] += 1
@@ -0,0 +1,31 @@
+from .bookings_manager import BookingsCacheManager
+from .spot_manager import SpotCacheManager
+from .zone_manager import ZoneCacheManager
+
+
+class CacheRegistry:
+    """
+    Holds one zone, one spot and one bookings cache for a session.
+
+    The registry is meant to be created once per session and passed to all the actions (and the actions they compose),
+    so they reuse each other's data instead of repeating identical requests within one run.
+    """
+
+    def __init__(self, session_object, persistent_cache=None, bookings_ttl: float = 60,
+                 metadata: "CacheRegistry" = None):
+        """
+        :param session_object: Session object the caches use to fetch the data.
+        :param persistent_cache: Optional `PersistentCache` for zones and spot IDs.
+        :param bookings_ttl: Time (in seconds) after which the cached bookings are fetched again.
+        :param metadata: Registry to share zones and spot IDs with (accounts of the same tenant see the same ones).
+                         They are fetched (and stored in the persistent cache) by the registry that owns them.
+                         The spots' state and the bookings are always fetched with the registry's own session.
+        """
+        self.session_object = session_object
+        if metadata is not None:
+            self.zone_manager = metadata.zone_manager
+            self.spot_manager = metadata.spot_manager.for_session(session_object)
+        else:
+            self.zone_manager = ZoneCacheManager(session_object, persistent_cache=persistent_cache)
+            self.spot_manager = SpotCacheManager(session_object, persistent_cache=persistent_cache)
+        self.bookings_manager = BookingsCacheManager(session_object, ttl=bookings_ttl)
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import pathlib
+import time
+
+from .. import tracing
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PersistentCache:
+    """
+    File-backed cache for data that rarely changes (zones, spot IDs), shared between runs of the app.
+
+    Every entry is kept in a separate JSON file in a directory specific for the account
+    and expires after `ttl` seconds.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, account: str, ttl: float):
+        """
+        :param cache_dir: Directory to keep the cache files in.
+        :param account: The account (user name) the cached data belongs to.
+        :param ttl: Time (in seconds) the entries are valid for.
+        """
+        # don't expose the user name in the file system
+        account_key = hashlib.sha256(account.encode("utf-8")).hexdigest()[:16]
+        self.directory = pathlib.Path(cache_dir) / "cache" / account_key
+        self.ttl = ttl
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str):
+        """
+        Return cached value for the key or None if it is not cached or expired.
+        """
+        with tracing.span("persistent cache get", "cache", {"key": key}) as span:
+            value = self.__read(key)
+            span.set_attribute("cache", "miss" if value is None else "hit")
+            return value
+
+    def __read(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["stored_at"] > self.ttl:
+                logger.debug(f"Cache entry {key} expired")
+                return None
+            return entry["value"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+
+    def set(self, key: str, value):
+        """
+        Store the value (it must be JSON-serializable) under the key.
+        """
+        with tracing.span("persistent cache set", "cache", {"key": key}):
+            self.__write(key, value)
+
+    def __write(self, key: str, value):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path(key).with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": time.time(), "value": value}, f)
+            # replace in one step, so a concurrent run never reads a half-written file
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Couldn't store cache entry {key}: {e}")
+
+    def invalidate(self, key: str = None):
+        """
+        Remove the entry for the key, or all the account's entries if no key is given.
+        """
+        paths = [self._path(key)] if key else self.directory.glob("*.json")
+        for path in paths:
+            path.unlink(missing_ok=True)
@@ -2,18 +2,21 @@ from ..log_config import get_logger
 
 logger = get_logger(__name__)
 
+from .cache_registry import CacheRegistry
 from ..actions.action_base import ParkanizerActionBase
 
 
 class ReleaseSpot(ParkanizerActionBase):
 
-    def __init__(self, session, payload: dict[str, str]):
+    def __init__(self, session, payload: dict[str, str], caches: CacheRegistry = None):
         """
         Initialize the class with the session_spot object.
         :param session: Session object for accessing the Parkanizer service.
         :param payload: dict with keys: for_date (YYYY-mm-dd), zone_name, spot_name
+        :param caches: Caches shared with other actions (a new registry is created if not given).
         """
         super().__init__(session, payload)
+        self.caches = caches if caches is not None else CacheRegistry(session)
         logger.info(f'Payload: {self.payload}')
 
     # TODO XXX it seems not to be used...
@@ -27,6 +30,7 @@ class ReleaseSpot(ParkanizerActionBase):
         try:
             response = self.session.release_spot(self.payload['for_date'])
             if not response:
+                self.caches.bookings_manager.record_release(self.payload['for_date'])
                 result['result'] = {
                     'status': 'success',
                     'message': f"Released spot for {self.payload['for_date']} successfully"}
@@ -1,5 +1,4 @@
-from .bookings_manager import BookingsCacheManager
-from .zone_manager import ZoneCacheManager
+from .cache_registry import CacheRegistry
 from ..actions.action_base import ParkanizerActionBase
 from ..log_config import get_logger
 
@@ -7,20 +6,21 @@ logger = get_logger(__name__)
 
 
 class ShowBookings(ParkanizerActionBase):
-    def __init__(self, session, payload: dict):
+    def __init__(self, session, payload: dict, caches: CacheRegistry = None):
         super().__init__(session, payload)
-        self.zone_manager = ZoneCacheManager(session)  # TODO Think about singleton if you want to combine actions
-        self.booking_manager = BookingsCacheManager(session)
+        self.caches = caches if caches is not None else CacheRegistry(session)
+        self.zone_manager = self.caches.zone_manager
+        self.booking_manager = self.caches.bookings_manager
         logger.info(f'Payload: {self.payload}')
 
     def do(self):
         logger.info(f'Get booking info for: {self.payload}')
-        # get objects' IDs
-        zone = self.zone_manager.get_by_name(self.payload['zone_name'])
-        zone_id = zone.get('id') if zone else None
-
         result: dict[str, dict | list] = {'action': 'show_bookings', 'request': self.payload}
         try:
+            # get objects' IDs
+            zone = self.zone_manager.get_by_name(self.payload['zone_name'])
+            zone_id = zone.get('id') if zone else None
+
             response = self.booking_manager.get_bookings(zone_id)
             result['result'] = {
                 'status': 'success',
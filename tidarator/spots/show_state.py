@@ -1,5 +1,6 @@
-from .spot_manager import SpotCacheManager
-from .zone_manager import ZoneCacheManager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .cache_registry import CacheRegistry
 from ..actions.action_base import ParkanizerActionBase
 from ..api.utils import str_to_date
 from ..log_config import get_logger
@@ -9,15 +10,17 @@ logger = get_logger(__name__)
 
 class ShowSpotsState(ParkanizerActionBase):
 
-    def __init__(self, session, payload: dict[str, str | list[str]]):
+    def __init__(self, session, payload: dict[str, str | list[str]], caches: CacheRegistry = None):
         """
         Initialize the class with the session_spot object.
         :param session: Session object for accessing the Parkanizer service.
         :param payload: dict with keys: for_date (YYYY-mm-dd), zone_name, spot_name
+        :param caches: Caches shared with other actions (a new registry is created if not given).
         """
         super().__init__(session, payload)
-        self.zone_manager = ZoneCacheManager(session)
-        self.spot_manager = SpotCacheManager(session)
+        self.caches = caches if caches is not None else CacheRegistry(session)
+        self.zone_manager = self.caches.zone_manager
+        self.spot_manager = self.caches.spot_manager
         logger.info(f'Payload: {self.payload}')
 
     def do_for_payload(self, p: dict[str, str | list[str]]) -> dict:
@@ -29,6 +32,8 @@ class ShowSpotsState(ParkanizerActionBase):
         result: dict[str, dict] = {'action': 'show_spots', 'request': p}
 
         try:
+            if zone is None:
+                raise ValueError(f"Unknown zone: {p['zone_name']}")
             spots = self.spot_manager.get_spots_state(zone_id, str_to_date(p['for_date']))
             result['result'] = {
                 'zone': zone['name'],
@@ -40,9 +45,28 @@ class ShowSpotsState(ParkanizerActionBase):
             self.notify_listeners('success', result)
 
         except Exception as e:
+            result['result'] = {'zone': p['zone_name'], 'for_date': p['for_date'], 'status': 'error', 'error': str(e)}
             self.notify_listeners('error', {'error': str(e)})
 
         return result
 
+    def stream(self, zone_names: list[str], days: list[str], concurrency: int = 4):
+        """
+        Fetch the spots' state for every zone and day (`concurrency` at once)
+        and yield the results as soon as they arrive (so not in the order of the days).
+        """
+        # resolve the zones once, so the workers don't race to fetch them
+        for zone_name in zone_names:
+            self.zone_manager.get_by_name(zone_name)
+
+        payloads = [{'for_date': day, 'zone_name': zone_name} for zone_name in zone_names for day in days]
+        if concurrency <= 1:
+            yield from (self.do_for_payload(p) for p in payloads)
+            return
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(payloads)), thread_name_prefix='show-spots') as executor:
+            futures = [executor.submit(self.do_for_payload, p) for p in payloads]
+            for future in as_completed(futures):
+                yield future.result()
+
     def do(self):
         return self.do_for_payload(self.payload)
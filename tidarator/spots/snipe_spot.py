@@ -0,0 +1,182 @@
+import time
+from datetime import datetime
+
+from .book_spot import BookSpot
+from .cache_registry import CacheRegistry
+from ..api.retry import RETRY
+from ..api.utils import str_to_date
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class SnipeSpot(BookSpot):
+    """
+    Book a spot at the exact moment the booking window opens.
+
+    Everything that doesn't depend on the spots' state (zone and spot IDs, `take_spot` payloads, the connection)
+    is prepared ahead of time, then the action waits for the configured instant and only sends `take_spot` requests.
+    """
+
+    # how long before the target time the connection is refreshed
+    WARM_UP_LEAD = 3.0
+    # below this distance to the target time the action spins instead of sleeping (sleep is not precise enough)
+    SPIN_THRESHOLD = 0.05
+
+    def __init__(self, session, payload: dict, caches: CacheRegistry = None):
+        """
+        Initialize the class with the session_spot object.
+        :param session: Session object for accessing the Parkanizer service.
+        :param payload: dict with keys: for_date (YYYY-mm-dd), zone_name, spot_name, fire_at (datetime),
+                        and optionally: retries (default 0), retry_interval (seconds, default 0.2)
+        :param caches: Caches shared with other actions (a new registry is created if not given).
+        """
+        # the retry policy only tells which errors are worth another round (the requests are sent by the action itself)
+        super().__init__(session, payload, caches=caches)
+        self.zone = None
+        self.prepared = []
+
+    def prepare(self):
+        """
+        Resolve zone and spot IDs and build `take_spot` payloads for the preferred spots (in order of preference).
+        """
+        p = self.payload
+        self.zone = self.zone_manager.get_by_name(p['zone_name'])
+        zone_id = self.zone.get('id') if self.zone else None
+
+        spots = p['spot_name']
+        if type(spots) is str:
+            spots = [spots]
+
+        self.prepared = []
+        for preference in spots:
+            if preference == '*':
+                self.prepared.append((None, self.session.take_spot_payload(zone_id, None, p['for_date'])))
+                break
+            spot = self.spot_manager.get_by_name(zone_id, preference)
+            if spot:
+                self.prepared.append((spot['id'], self.session.take_spot_payload(zone_id, spot['id'], p['for_date'])))
+            else:
+                logger.warning(f'Unknown spot {preference} in {p["zone_name"]}, skipping it')
+
+        logger.debug(f'Zone ID: {zone_id}; prepared payloads: {self.prepared}')
+
+    def _wait_until(self, deadline: float):
+        """
+        Wait until `time.perf_counter()` reaches the deadline: sleep most of the time, spin for the last moment.
+        """
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining > self.SPIN_THRESHOLD:
+                time.sleep(remaining - self.SPIN_THRESHOLD)
+
+    def _fire(self, spot_id: str, request_payload: dict, deadline: float) -> tuple[dict | None, Exception | None, dict]:
+        sent = time.perf_counter()
+        try:
+            response, error = self.session.take_spot_with_payload(request_payload), None
+        except Exception as e:
+            response, error = None, e
+            self.notify_listeners('error', {'error': str(e)})
+        received = time.perf_counter()
+
+        attempt = {
+            'spot_id': spot_id,
+            'status': response.get('status') if response else 'error',
+            'sent_ms': round((sent - deadline) * 1000, 1),
+            'latency_ms': round((received - deadline) * 1000, 1),
+            'rtt_ms': round((received - sent) * 1000, 1),
+        }
+        logger.info(f'take_spot attempt: {attempt}')
+        return response, error, attempt
+
+    def _still_bookable(self, rejected: list[tuple]) -> list[tuple] | dict:
+        """
+        Tell which of the rejected spots are worth requesting again.
+        The service doesn't say why `take_spot` was rejected (only a reservation has a known status): the day may not
+        be open yet, the spot may be taken or the day may be booked already. So the bookings and the spots' state
+        are checked instead. Return the spots that are still free, or the reservation held for the day (if any).
+        """
+        zone_id = self.zone.get('id') if self.zone else None
+        day = self.payload['for_date']
+        try:
+            # the bookings of the day were invalidated by the rejection
+            booking = self.caches.bookings_manager.get_by_date(zone_id, day)
+            if booking and booking['my_booking']:
+                return booking['my_booking']
+            states = self.spot_manager.get_spots_state(zone_id, str_to_date(day))
+        except Exception as e:
+            logger.warning(f"Couldn't check why take_spot was rejected, requesting all the spots again: {e}")
+            return rejected
+        free = {spot['id'] for spot in states if spot['free']}
+        return [(spot_id, request_payload) for spot_id, request_payload in rejected
+                if spot_id in free or (spot_id is None and free)]
+
+    def do(self):
+        p = self.payload
+        fire_at: datetime = p['fire_at']
+        retries = p.get('retries', 0)
+        retry_interval = p.get('retry_interval', 0.2)
+
+        self.prepare()
+
+        # translate wall-clock target into the high-resolution monotonic clock once
+        deadline = time.perf_counter() + (fire_at - datetime.now()).total_seconds()
+        logger.info(f'Waiting for {fire_at} to book a spot for {p["for_date"]}')
+
+        self._wait_until(deadline - self.WARM_UP_LEAD)
+        self.session.warm_up()
+        self._wait_until(deadline)
+
+        result: dict[str, dict] = {'action': 'snipe_spot', 'request': p}
+        attempts = []
+        pending = self.prepared
+        for round_number in range(retries + 1):
+            if not pending:
+                break
+            # staggered retries: round N is not sent earlier than N * retry_interval after the target time
+            self._wait_until(deadline + round_number * retry_interval)
+            # only the spots that failed in a way worth retrying are requested again
+            retry, rejected = [], []
+            for spot_id, request_payload in pending:
+                response, error, attempt = self._fire(spot_id, request_payload, deadline)
+                attempts.append(attempt)
+                reservation = response and self._reservation_result(self.zone, p, response)
+                if reservation:
+                    result['result'] = {**reservation, 'attempts': attempts}
+                    self.notify_listeners('success', result)
+                    return result
+                if response is not None:
+                    rejected.append((spot_id, request_payload))
+                elif self.retry_policy.classify(response, error) == RETRY:
+                    retry.append((spot_id, request_payload))
+
+            if rejected and round_number < retries:
+                bookable = self._still_bookable(rejected)
+                if isinstance(bookable, dict):
+                    return self._held(bookable, attempts)
+                retry += bookable
+            # keep the order of preference
+            pending = [prepared for prepared in pending if prepared in retry]
+
+        result['result'] = {'status': 'failure', 'attempts': attempts}
+        self.notify_listeners('failure', result)
+        return result
+
+    def _held(self, booking: dict, attempts: list[dict]) -> dict:
+        """
+        Finish the action, as the day turned out to be booked already.
+        A preferred spot counts as a success (an attempt whose response was lost may have taken it).
+        """
+        p = self.payload
+        result: dict[str, dict] = {'action': 'snipe_spot', 'request': p}
+        if any(spot_id in (None, booking['id']) for spot_id, _ in self.prepared):
+            reservation = self._reservation_result(self.zone, p, {'status': 'Reserved', 'receivedParkingSpotOrNull': booking})
+            result['result'] = {**reservation, 'attempts': attempts}
+            self.notify_listeners('success', result)
+            return result
+        logger.info(f"Spot {booking['name']} is already reserved for {p['for_date']}, giving up")
+        result['result'] = {'status': 'failure', 'attempts': attempts}
+        self.notify_listeners('failure', result)
+        return result
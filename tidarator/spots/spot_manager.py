@@ -1,20 +1,58 @@
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from .utils import index_by
+from .. import tracing
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
 
 class SpotCacheManager:
     """
     Responsible for getting and returning spots for given zone.
 
     It holds (and caches) spots dictionary (id, name).
+    The last spots' state of recent days is kept as well, so unchanged maps are detected (and not parsed) again.
     """
 
-    def __init__(self, session_object):
+    # how many (zone, day) spots' states are kept
+    MAX_STATES = 64
+
+    def __init__(self, session_object, persistent_cache=None):
         """
         Initializes with a session object (that the class will use to fetch spots).
-        Optionally force_fetch can be set to True to force a fetch of spots on init.
+        Optionally persistent_cache (`PersistentCache`) can be given to reuse spots fetched by previous runs.
         """
         self.session_object = session_object
+        self.persistent_cache = persistent_cache
         self.__spots = {}
+        self.__states = OrderedDict()
+        self.__states_lock = threading.Lock()
+        self.__by_name = {}
+        self.__by_id = {}
+        # zones which spots were read from the persistent cache (they may be outdated: a spot may have been added)
+        self.__from_persistent_cache = set()
+
+    def for_session(self, session_object) -> "SpotCacheManager":
+        """
+        Return a manager that shares the spots (id, name) with this one, but fetches the spots' state with its own
+        session. The spots are the same for all the accounts of a tenant, while the state is fetched on behalf
+        of the account (and counts against its session's limits).
+        """
+        manager = SpotCacheManager(session_object, persistent_cache=self.persistent_cache)
+        manager.__spots = self.__spots
+        manager.__by_name = self.__by_name
+        manager.__by_id = self.__by_id
+        manager.__from_persistent_cache = self.__from_persistent_cache
+        return manager
+
+    def __set_spots(self, zone_id: str, spots: list[dict]):
+        # indexes are built once per fetch, so lookups don't scan the list
+        self.__by_name[zone_id] = index_by(spots, "name")
+        self.__by_id[zone_id] = index_by(spots, "id")
+        self.__spots[zone_id] = spots
 
     # Extract unique reserved parking spots
     @staticmethod
@@ -26,15 +64,45 @@ class SpotCacheManager:
 
     def __fetch_spots(self, zone_id: str):
         data = self.session_object.get_spots_map(zone_id)
-        return self.__extract_unique_parking_spots(data)
+        spots = self.__extract_unique_parking_spots(data)
+        if self.persistent_cache:
+            self.persistent_cache.set(f"spots-{zone_id}", spots)
+        return spots
 
     def get_spots(self, zone_id: str):
         """
         Return spots dictionary (id, name) for a given zone.
         """
-        if not zone_id in self.__spots:
-            self.__spots[zone_id] = self.__fetch_spots(zone_id)
-        return self.__spots[zone_id]
+        with tracing.span("get spots", "cache", {"zone_id": zone_id, "cache": "hit"}) as span:
+            if not zone_id in self.__spots and self.persistent_cache:
+                span.set_attribute("cache", "persistent")
+                spots = self.persistent_cache.get(f"spots-{zone_id}")
+                if spots:
+                    self.__set_spots(zone_id, spots)
+                    self.__from_persistent_cache.add(zone_id)
+            if not zone_id in self.__spots:
+                span.set_attribute("cache", "miss")
+                self.__set_spots(zone_id, self.__fetch_spots(zone_id))
+            return self.__spots[zone_id]
+
+    def invalidate(self, zone_id: str):
+        """
+        Forget the zone's spots (in memory and in the persistent cache), so they are fetched again.
+        """
+        self.__spots.pop(zone_id, None)
+        self.__from_persistent_cache.discard(zone_id)
+        if self.persistent_cache:
+            self.persistent_cache.invalidate(f"spots-{zone_id}")
+
+    def __lookup(self, zone_id: str, find, key):
+        self.get_spots(zone_id)
+        spot = find()
+        if spot is None and zone_id in self.__from_persistent_cache:
+            logger.info(f"Spot {key} not found in the cached spots of zone {zone_id}, fetching them again")
+            self.invalidate(zone_id)
+            self.get_spots(zone_id)
+            spot = find()
+        return spot
 
     def get_by_id(self, zone_id: str, spot_id: str):
         """
@@ -43,7 +111,7 @@ class SpotCacheManager:
         :param spot_id: The id of the spot to search for.
         :return: The spot object or None if not found.
         """
-        return next((spot for spot in self.get_spots(zone_id) if spot.get("id") == spot_id), None)
+        return self.__lookup(zone_id, lambda: self.__by_id[zone_id].get(spot_id), spot_id)
 
     def get_by_name(self, zone_id: str, name: str):
         """
@@ -52,14 +120,73 @@ class SpotCacheManager:
         :param name: The name of the spot to search for.
         :return: The spot object or None if not found.
         """
-        return next((spot for spot in self.get_spots(zone_id) if spot.get("name") == name), None)
+        return self.__lookup(zone_id, lambda: self.__by_name[zone_id].get(name), name)
 
     def get_spots_state(self, zone_id: str, for_date: datetime):
         """
-        Return current spots' state for a given zone (free/booked)
+        Return current spots' state for a given zone (free/booked).
+        An unchanged map (same ETag or body hash as the previous fetch for the zone and day) isn't parsed again.
+        """
+        key = (zone_id, for_date.strftime("%Y-%m-%d"))
+        with tracing.span("get spots state", "cache", {"zone_id": zone_id, "day": key[1]}) as span:
+            with self.__states_lock:
+                validator, previous = self.__states.get(key, (None, None))
+
+            data, validator = self.session_object.get_spots_map_if_changed(zone_id, for_date, validator)
+            if data is None:
+                # the map is the same, so are the states
+                span.set_attribute("cache", "unchanged")
+                with self.__states_lock:
+                    self.__states.move_to_end(key)
+                return previous
+            span.set_attribute("cache", "miss" if previous is None else "changed")
+
+            states = [
+                {'id': spot['id'], 'name': spot['name'], 'free': spot['state'] == 'Free'}
+                for spot in data['mapOrNull']['parkingSpots']
+            ]
+            with self.__states_lock:
+                self.__states[key] = (validator, states)
+                self.__states.move_to_end(key)
+                while len(self.__states) > self.MAX_STATES:
+                    self.__states.popitem(last=False)
+            return states
+
+
+class SpotStateTracker:
+    """
+    Tells which spots changed their state since its consumer looked at them the previous time.
+
+    The spot manager is shared by many actions (and accounts), so it can't tell what a given consumer has already seen;
+    every consumer keeps its own tracker instead. Maps that didn't change since the manager's previous fetch are
+    recognized by the manager (see `SpotCacheManager.get_spots_state`), so they cost neither parsing nor comparing.
+    The tracker isn't thread-safe: it's meant for one consumer.
+    """
+
+    # how many (zone, day) spots' states are remembered
+    MAX_STATES = SpotCacheManager.MAX_STATES
+
+    def __init__(self, spot_manager: SpotCacheManager):
+        self.spot_manager = spot_manager
+        self.__seen = OrderedDict()
+
+    def get_changes(self, zone_id: str, for_date: datetime) -> tuple[list[dict], list[dict]]:
+        """
+        Return current spots' state for a given zone and day, and the spots which state changed since the previous
+        call for the zone and day (all the spots for the first call).
         """
-        data = self.session_object.get_spots_map(zone_id, for_date)
-        return list([
-            {'id': spot['id'], 'name': spot['name'], 'free': spot['state'] == 'Free'}
-            for spot in data['mapOrNull']['parkingSpots']
-        ])
+        key = (zone_id, for_date.strftime("%Y-%m-%d"))
+        states = self.spot_manager.get_spots_state(zone_id, for_date)
+        previous = self.__seen.get(key)
+        self.__seen[key] = states
+        self.__seen.move_to_end(key)
+        while len(self.__seen) > self.MAX_STATES:
+            self.__seen.popitem(last=False)
+
+        if previous is states:
+            # the manager returns the same states for an unchanged map
+            return states, []
+        if previous is None:
+            return states, states
+        was_free = {spot['id']: spot['free'] for spot in previous}
+        return states, [spot for spot in states if was_free.get(spot['id']) != spot['free']]
@@ -0,0 +1,8 @@
+def index_by(items: list[dict], key: str) -> dict:
+    """
+    Build a lookup dict of the items by given key (if the key repeats, the first item wins).
+    """
+    index = {}
+    for item in items:
+        index.setdefault(item.get(key), item)
+    return index
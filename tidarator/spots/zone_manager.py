@@ -1,19 +1,72 @@
+from .utils import index_by
+from .. import tracing
+from ..log_config import get_logger
+
+logger = get_logger(__name__)
+
+
 class ZoneCacheManager:
-    def __init__(self, session_object, force_fetch: bool = False):
+    def __init__(self, session_object, force_fetch: bool = False, persistent_cache=None):
         """
         Initializes with a session object (that the class will use to fetch zones).
         Optionally force_fetch can be set to True to force a fetch of zones on init.
+        Optionally persistent_cache (`PersistentCache`) can be given to reuse zones fetched by previous runs.
         """
         self.session_object = session_object
+        self.persistent_cache = persistent_cache
+        self.__by_name = {}
+        self.__by_id = {}
+        # zones read from the persistent cache may be outdated (a zone may have been added since they were stored)
+        self.__from_persistent_cache = False
         if force_fetch:
-            self.__zones = self.session_object.get_zones()
+            self.__set_zones(self.__fetch_zones())
         else:
             self.__zones = None
 
+    def __set_zones(self, zones):
+        # indexes are built once per fetch, so lookups don't scan the list
+        self.__by_name = index_by(zones, "name")
+        self.__by_id = index_by(zones, "id")
+        self.__zones = zones
+
+    def __fetch_zones(self):
+        zones = self.session_object.get_zones()
+        if self.persistent_cache:
+            self.persistent_cache.set("zones", zones)
+        return zones
+
     def get_zones(self):
-        if not self.__zones:
-            self.__zones = self.session_object.get_zones()
-        return self.__zones
+        with tracing.span("get zones", "cache") as span:
+            span.set_attribute("cache", "hit")
+            if not self.__zones and self.persistent_cache:
+                span.set_attribute("cache", "persistent")
+                zones = self.persistent_cache.get("zones")
+                if zones:
+                    self.__set_zones(zones)
+                    self.__from_persistent_cache = True
+            if not self.__zones:
+                span.set_attribute("cache", "miss")
+                self.__set_zones(self.__fetch_zones())
+            return self.__zones
+
+    def invalidate(self):
+        """
+        Forget the zones (in memory and in the persistent cache), so they are fetched again.
+        """
+        self.__zones = None
+        self.__from_persistent_cache = False
+        if self.persistent_cache:
+            self.persistent_cache.invalidate("zones")
+
+    def __lookup(self, find, key) -> dict:
+        self.get_zones()
+        zone = find()
+        if zone is None and self.__from_persistent_cache:
+            logger.info(f"Zone {key} not found in the cached zones, fetching them again")
+            self.invalidate()
+            self.get_zones()
+            zone = find()
+        return zone
 
     def get_by_name(self, name) -> dict:
         """
@@ -21,7 +74,7 @@ class ZoneCacheManager:
         :param name: The name of the zone to search for.
         :return: The zone object or None if not found.
         """
-        return next((zone for zone in self.get_zones() if zone.get("name") == name), None)
+        return self.__lookup(lambda: self.__by_name.get(name), name)
 
     def get_by_id(self, zone_id) -> dict:
         """
@@ -29,4 +82,4 @@ class ZoneCacheManager:
         :param zone_id: The id of the zone to search for.
         :return: The zone object or None if not found.
         """
-        return next((zone for zone in self.get_zones() if zone.get("id") == zone_id), None)
+        return self.__lookup(lambda: self.__by_id.get(zone_id), zone_id)
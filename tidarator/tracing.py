@@ -0,0 +1,168 @@
+"""
+Tracing spans (timed and nested operations: actions, cache lookups, HTTP calls) of a run.
+
+By default the spans are not recorded (the no-op tracer costs next to nothing). With `RecordingTracer` installed
+(see `set_tracer`), the spans are kept and can be written as a Chrome trace file, which chrome://tracing or
+https://ui.perfetto.dev show as a timeline (a flame chart per thread).
+"""
+import json
+import os
+import pathlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    A recorded operation.
+    """
+
+    __slots__ = ("name", "category", "attributes", "start", "end", "thread_id")
+
+    def __init__(self, name: str, category: str, attributes: dict = None):
+        self.name = name
+        self.category = category
+        self.attributes = dict(attributes) if attributes else {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread_id = threading.get_ident()
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+
+class _NoopSpan:
+    """
+    Span (and its context manager) that records nothing.
+    """
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    """
+    The default tracer: spans are not recorded.
+    """
+
+    recording = False
+
+    def span(self, name: str, category: str = "app", attributes: dict = None):
+        return _NOOP_SPAN
+
+    def event(self, name: str, category: str = "app", attributes: dict = None):
+        pass
+
+
+class RecordingTracer:
+    """
+    Keeps the spans (and instant events) of the run, to be written as a Chrome trace file.
+    """
+
+    recording = True
+
+    def __init__(self, max_spans: int = 100000):
+        """
+        :param max_spans: How many spans are kept (the oldest are dropped in long-running processes).
+        """
+        self._origin = time.perf_counter()
+        self._spans = deque(maxlen=max_spans)
+        self._events = deque(maxlen=max_spans)
+        self._threads = {}
+
+    @contextmanager
+    def span(self, name: str, category: str = "app", attributes: dict = None):
+        """
+        Record the time the `with` block takes (the yielded span can be given more attributes).
+        """
+        span = Span(name, category, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            span.end = time.perf_counter()
+            self._threads[span.thread_id] = threading.current_thread().name
+            self._spans.append(span)
+
+    def event(self, name: str, category: str = "app", attributes: dict = None):
+        """
+        Record a moment (without duration).
+        """
+        event = Span(name, category, attributes)
+        self._threads[event.thread_id] = threading.current_thread().name
+        self._events.append(event)
+
+    def _us(self, moment: float) -> float:
+        return round((moment - self._origin) * 1_000_000, 3)
+
+    def chrome_trace(self) -> dict:
+        """
+        Return the spans in Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "tidarator"}}]
+        events += [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        events += [
+            {"name": span.name, "cat": span.category, "ph": "X", "ts": self._us(span.start),
+             "dur": round((span.end - span.start) * 1_000_000, 3), "pid": pid, "tid": span.thread_id,
+             "args": span.attributes}
+            for span in list(self._spans)
+        ]
+        events += [
+            {"name": event.name, "cat": event.category, "ph": "i", "s": "t", "ts": self._us(event.start),
+             "pid": pid, "tid": event.thread_id, "args": event.attributes}
+            for event in list(self._events)
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: pathlib.Path):
+        """
+        Write the Chrome trace file (replaced at once, so its readers never see a partial content).
+        """
+        path = pathlib.Path(path)
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(json.dumps(self.chrome_trace(), default=str))
+        os.replace(temporary, path)
+
+
+_tracer = NoopTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer):
+    """
+    Install the tracer for the whole process (`NoopTracer` turns the tracing off).
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, category: str = "app", attributes: dict = None):
+    """
+    Return the context manager timing the operation with the current tracer.
+    """
+    return _tracer.span(name, category, attributes)
+
+
+def event(name: str, category: str = "app", attributes: dict = None):
+    _tracer.event(name, category, attributes)
+
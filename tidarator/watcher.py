@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from datetime import datetime
+
+from .api import utils
+from .log_config import get_logger
+from .spots.availability import AvailabilityMatrix
+from .spots.spot_manager import SpotStateTracker
+
+logger = get_logger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests per minute the watcher sends (bursts up to `burst` are allowed).
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1, stop: threading.Event = None):
+        """
+        :param per_minute: Allowed requests per minute (on average).
+        :param burst: How many requests may be sent at once, after a quiet period.
+        :param stop: Event that interrupts waiting for a token.
+        """
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stop = stop if stop is not None else threading.Event()
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, count: int = 1) -> bool:
+        """
+        Wait for `count` tokens (count may exceed the burst, then the wait is longer). Return False if stopped.
+        """
+        self._refill()
+        self.tokens -= count
+        if self.tokens < 0:
+            return not self.stop.wait(-self.tokens / self.rate)
+        return not self.stop.is_set()
+
+
+class Watcher:
+    """
+    Polls the user's bookings (the number of free spots of every day) and books days, where preferred spots become free.
+
+    Every poll is a single request. Only for the days which number of free spots changed, the spots' map is fetched
+    to see which spots became free; the day is booked if one of them is preferred.
+
+    The polling interval adapts: it drops to `min_interval` after a change and grows (up to `max_interval`)
+    while nothing changes. It is randomized by `jitter`, and all the requests are subject to a rate limit,
+    so the load on the service stays modest.
+    """
+
+    # how much the interval grows after a poll with no changes
+    BACKOFF = 1.5
+
+    def __init__(self, session, caches, zone_name: str, book_day, look_from: datetime = None,
+                 min_interval: float = 30, max_interval: float = 300, jitter: float = 0.2,
+                 requests_per_minute: float = 10, spot_names: list[str] = None):
+        """
+        :param session: Logged-in session object.
+        :param caches: `CacheRegistry` of the session.
+        :param zone_name: The zone to watch.
+        :param book_day: Callable that takes a day (YYYY-mm-dd) and the day's `AvailabilityMatrix`,
+                         tries to book the day and returns the result.
+        :param look_from: The first day to watch (default: today).
+        :param min_interval: Shortest time (in seconds) between the polls.
+        :param max_interval: Longest time (in seconds) between the polls.
+        :param jitter: Relative randomization of the interval (0.2 means +/- 20%).
+        :param requests_per_minute: Max requests per minute (the polls and the booking attempts).
+        :param spot_names: Preferred spots: a day is booked when one of them becomes free ('*' or None: any spot).
+        """
+        self.session = session
+        self.caches = caches
+        self.zone_name = zone_name
+        self.book_day = book_day
+        self.look_from = look_from
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.jitter = jitter
+        self._stop = threading.Event()
+        self.limiter = RateLimiter(requests_per_minute, stop=self._stop)
+        self.interval = min_interval
+        self.spot_names = spot_names
+        self.snapshot: dict[str, int] | None = None
+        self.tracker = SpotStateTracker(caches.spot_manager)
+
+    def stop(self):
+        self._stop.set()
+
+    def _candidates(self, bookings: list[dict]) -> dict[str, int]:
+        """
+        Return the number of free spots of the days worth booking (workdays from `look_from` not booked yet).
+        """
+        look_from = self.look_from or datetime.combine(datetime.today(), datetime.min.time())
+        return {
+            booking['day']: booking['free_spots'] or 0
+            for booking in bookings
+            if utils.str_to_date(booking['day']) >= look_from
+               and not booking['my_booking']
+               and utils.str_to_date(booking['day']).weekday() < 5
+        }
+
+    def poll(self, zone_id: str) -> list[str]:
+        """
+        Fetch the bookings and return the days with free spots, which number of free spots changed
+        (all the days with free spots on the first poll).
+        """
+        bookings_manager = self.caches.bookings_manager
+        bookings_manager.invalidate(zone_id)
+        current = self._candidates(bookings_manager.get_bookings(zone_id))
+        previous = self.snapshot if self.snapshot is not None else {}
+        self.snapshot = current
+        return [day for day, free in current.items() if free > 0 and free != previous.get(day)]
+
+    def _preferred(self, spots: list[dict]) -> list[dict]:
+        """
+        Return the preferred ones of the given spots.
+        """
+        if not self.spot_names or '*' in self.spot_names:
+            return spots
+        return [spot for spot in spots if spot['name'] in self.spot_names]
+
+    def freed(self, zone_id: str, day: str) -> tuple[list[dict], list[dict]]:
+        """
+        Return the day's spots' state and the preferred spots that became free since the previous look at the day.
+        """
+        states, changes = self.tracker.get_changes(zone_id, utils.str_to_date(day))
+        return states, self._preferred([spot for spot in changes if spot['free']])
+
+    def _next_interval(self, changed: bool) -> float:
+        self.interval = self.min_interval if changed else min(self.max_interval, self.interval * self.BACKOFF)
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run(self):
+        zone = self.caches.zone_manager.get_by_name(self.zone_name)
+        if zone is None:
+            raise ValueError(f"Unknown zone: {self.zone_name}")
+        logger.info(f"Watching zone {self.zone_name}")
+
+        while self.limiter.acquire():
+            changed = []
+            try:
+                self.session.token_manager.ensure_fresh()
+                changed = self.poll(zone['id'])
+            except Exception as e:
+                logger.error(f"Polling failed: {e}")
+
+            for day in changed:
+                # the spots' map of the day
+                if not self.limiter.acquire():
+                    break
+                try:
+                    states, freed = self.freed(zone['id'], day)
+                except Exception as e:
+                    logger.error(f"Couldn't fetch the spots of {day}: {e}")
+                    continue
+                if not freed:
+                    logger.debug(f"Free spots changed on {day}, but no preferred spot became free")
+                    continue
+
+                logger.info(f"Spots {[spot['name'] for spot in freed]} became free on {day}")
+                # the reservation (the spots' state is passed on, so it isn't fetched again)
+                if not self.limiter.acquire():
+                    break
+                try:
+                    self.book_day(day, AvailabilityMatrix(zone['id'], {day: states}))
+                except Exception as e:
+                    logger.exception(f"Booking {day} failed: {e}")
+
+            delay = self._next_interval(bool(changed))
+            logger.debug(f"Next poll in {delay:.1f}s")
+            if self._stop.wait(delay):
+                break
+        logger.info("Watcher stopped")